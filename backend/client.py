@@ -3,11 +3,42 @@ AgriSarthi — Databricks Agent Client
 Handles communication with Databricks Model Serving endpoint.
 """
 import os
-import json
 import time
 import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
 import httpx
-from typing import Optional, Dict, Any, AsyncGenerator
+import orjson
+from typing import Optional, Dict, Any, AsyncGenerator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Conversation logs are buffered and written as one multi-row INSERT per batch
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "50"))
+LOG_BATCH_MS = int(os.getenv("LOG_BATCH_MS", "50"))
+# Invocation bodies with only the message and session id spliced in
+INVOKE_BODY = b'{"messages":[{"role":"user","content":%b}],"custom_inputs":{"session_id":%b}}'
+STREAM_BODY = INVOKE_BODY[:-1] + b',"stream":true}'
+# Answers to session-less queries, reused for identical (language, message) pairs
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "300"))
+ANSWER_CACHE_SIZE = 1024
+NO_SESSION = ("", "default")
+LOG_COLUMNS = (
+    ("session_id", "STRING"), ("farmer_id", "STRING"), ("channel", "STRING"),
+    ("user_message", "STRING"), ("agent_response", "STRING"), ("language", "STRING"),
+    ("response_time_ms", "DOUBLE"),
+)
+
+
+def _stream_text(event: Any) -> str:
+    """Text of one streamed event: a plain string chunk or a chat-completion delta."""
+    if isinstance(event, str):
+        return event
+    if choices := event.get("choices"):
+        return (choices[0].get("delta") or {}).get("content") or ""
+    content = event.get("content")
+    return content if isinstance(content, str) else ""
 
 
 class DatabricksAgentClient:
@@ -28,58 +59,134 @@ class DatabricksAgentClient:
             )
 
         self.endpoint_url = f"{self.host}/serving-endpoints/{self.endpoint_name}/invocations"
-        self.headers = {
+        # Built once and attached to the client, so requests don't re-encode them
+        self.headers = httpx.Headers({
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json",
-        }
-
-    async def invoke(self, user_message: str, session_id: str = "default") -> str:
-        """Invoke the AgriSarthi agent endpoint."""
-        payload = {
-            "messages": [{"role": "user", "content": user_message}],
-            "custom_inputs": {"session_id": session_id},
-        }
-
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                self.endpoint_url, json=payload, headers=self.headers
+        })
+        # One pooled HTTP/2 client for the process: concurrent turns multiplex
+        # over a few warm TLS connections instead of handshaking on every call
+        self._http = httpx.AsyncClient(
+            http2=True,
+            headers=self.headers,
+            timeout=httpx.Timeout(120.0, connect=5.0),
+            limits=httpx.Limits(max_keepalive_connections=4, max_connections=50, keepalive_expiry=60.0),
+        )
+        self._answers: OrderedDict = OrderedDict()
+        self._log_queue: Optional[asyncio.Queue] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background conversation-log flusher (needs a running loop)."""
+        self._log_queue = asyncio.Queue()
+        self._flush_task = asyncio.create_task(self._flush_logs())
+
+    async def close(self):
+        if self._flush_task:
+            await self._log_queue.put(None)
+            await self._flush_task
+        await self._http.aclose()
+
+    @staticmethod
+    def _answer_key(user_message: str, language: str) -> tuple:
+        normalized = " ".join(user_message.lower().split())
+        return language, hashlib.sha1(normalized.encode()).hexdigest()
+
+    def _cached_answer(self, key: tuple) -> Optional[str]:
+        hit = self._answers.get(key)
+        if hit is None:
+            return None
+        if hit[0] < time.monotonic():
+            del self._answers[key]
+            return None
+        self._answers.move_to_end(key)
+        return hit[1]
+
+    def _cache_answer(self, key: tuple, answer: str) -> None:
+        self._answers[key] = (time.monotonic() + ANSWER_CACHE_TTL, answer)
+        self._answers.move_to_end(key)
+        if len(self._answers) > ANSWER_CACHE_SIZE:
+            self._answers.popitem(last=False)
+
+    async def invoke(
+        self, user_message: str, session_id: str = "default", language: str = "en-IN"
+    ) -> str:
+        """Invoke the AgriSarthi agent endpoint.
+        Session-less queries ("default" thread) run statelessly on the agent and
+        identical ones are answered from a short-lived in-process cache."""
+        key = None
+        if session_id in NO_SESSION:
+            session_id, key = "", self._answer_key(user_message, language)
+            if (cached := self._cached_answer(key)) is not None:
+                return cached
+
+        body = INVOKE_BODY % (orjson.dumps(user_message), orjson.dumps(session_id))
+
+        response = await self._http.post(self.endpoint_url, content=body)
+
+        if response.status_code == 200:
+            answer = self._response_text(response.json())
+            if key:
+                self._cache_answer(key, answer)
+            return answer
+        else:
+            raise Exception(
+                f"Databricks endpoint error: {response.status_code} — {response.text}"
             )
 
-            if response.status_code == 200:
-                result = response.json()
-                messages = result.get("messages", [])
-                if messages:
-                    return messages[-1].get("content", "I couldn't process your request.")
-                return result.get("output", "No response received.")
-            else:
-                raise Exception(
-                    f"Databricks endpoint error: {response.status_code} — {response.text}"
-                )
+    @staticmethod
+    def _response_text(result: Dict[str, Any]) -> str:
+        messages = result.get("messages", [])
+        if messages:
+            return messages[-1].get("content", "I couldn't process your request.")
+        return result.get("output", "No response received.")
 
     async def invoke_streaming(
-        self, user_message: str, session_id: str = "default"
+        self, user_message: str, session_id: str = "default", language: str = "en-IN"
     ) -> AsyncGenerator[str, None]:
         """
-        Invoke agent and simulate streaming by yielding word chunks.
-        (Agent endpoints don't support native SSE streaming.)
+        Invoke the agent with streaming enabled and yield text as the endpoint
+        sends it (server-sent events). An endpoint that answers without
+        streaming is passed through as a single chunk.
         """
-        try:
-            full_response = await self.invoke(user_message, session_id)
-
-            if not full_response:
-                yield "I couldn't process your request. Please try again."
+        key = None
+        if session_id in NO_SESSION:
+            session_id, key = "", self._answer_key(user_message, language)
+            if (cached := self._cached_answer(key)) is not None:
+                yield cached
                 return
 
-            words = full_response.split(" ")
-            for i in range(0, len(words), 3):
-                chunk = " ".join(words[i : i + 3])
-                if i + 3 < len(words):
-                    chunk += " "
-                yield chunk
-                await asyncio.sleep(0.03)
+        body = STREAM_BODY % (orjson.dumps(user_message), orjson.dumps(session_id))
+        try:
+            parts = []
+            async with self._http.stream("POST", self.endpoint_url, content=body) as response:
+                if response.status_code != 200:
+                    body = (await response.aread()).decode(errors="replace")
+                    raise Exception(f"Databricks endpoint error: {response.status_code} — {body}")
+
+                if "text/event-stream" not in response.headers.get("content-type", ""):
+                    text = self._response_text(orjson.loads(await response.aread()))
+                    if text:
+                        parts.append(text)
+                        yield text
+                else:
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if not data or data == "[DONE]":
+                            continue
+                        if text := _stream_text(orjson.loads(data)):
+                            parts.append(text)
+                            yield text
+
+            if not parts:
+                yield "I couldn't process your request. Please try again."
+            elif key:
+                self._cache_answer(key, "".join(parts))
 
         except Exception as e:
-            print(f"[CLIENT] invoke_streaming error: {e}")
+            logger.error("invoke_streaming error: %s", e)
             yield f"Sorry, I encountered an error: {str(e)}"
 
     async def log_conversation(
@@ -92,8 +199,51 @@ class DatabricksAgentClient:
         language: str = "en-IN",
         response_time_ms: float = 0,
     ) -> None:
-        """Log conversation to Delta table via SQL Statement API."""
+        """Queue a conversation turn for the Delta log table.
+        Without a running flusher the row is written immediately."""
+        row = (session_id, farmer_id, channel, user_message, agent_response[:500],
+               language, response_time_ms)
+        if self._log_queue is not None:
+            self._log_queue.put_nowait(row)
+        else:
+            await self._insert_logs([row])
+
+    async def _flush_logs(self):
+        """Collect queued rows for up to LOG_BATCH_MS or LOG_BATCH_SIZE rows, then
+        insert them with one statement. A None row flushes and stops."""
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            row = await self._log_queue.get()
+            if row is None:
+                return
+            batch = [row]
+            deadline = loop.time() + LOG_BATCH_MS / 1000
+            while len(batch) < LOG_BATCH_SIZE:
+                try:
+                    row = await asyncio.wait_for(self._log_queue.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+            await self._insert_logs(batch)
+
+    async def _insert_logs(self, rows: list) -> None:
+        """Write rows to the Delta log table via SQL Statement API.
+        Values are bound as named parameters (`:session_id0`, ...), so nothing is
+        escaped here and the statement text only varies with the batch size."""
         try:
+            values = ", ".join(
+                "(" + ", ".join(f":{name}{i}" for name, _ in LOG_COLUMNS) + ")"
+                for i in range(len(rows))
+            )
+            parameters = [
+                {"name": f"{name}{i}", "value": str(value), "type": sql_type}
+                for i, row in enumerate(rows)
+                for (name, sql_type), value in zip(LOG_COLUMNS, row)
+            ]
             sql_url = f"{self.host}/api/2.0/sql/statements"
             sql_payload = {
                 "warehouse_id": os.getenv("DATABRICKS_SQL_WAREHOUSE_ID", ""),
@@ -101,27 +251,23 @@ class DatabricksAgentClient:
                     INSERT INTO agrisarthi.main.conversation_logs
                     (session_id, farmer_id, channel, user_message, agent_response,
                      language, response_time_ms)
-                    VALUES ('{session_id}', '{farmer_id}', '{channel}',
-                            '{user_message.replace("'", "''")}',
-                            '{agent_response[:500].replace("'", "''")}',
-                            '{language}', {response_time_ms})
+                    VALUES {values}
                 """,
+                "parameters": parameters,
                 "wait_timeout": "10s",
             }
 
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                await client.post(sql_url, json=sql_payload, headers=self.headers)
+            await self._http.post(sql_url, json=sql_payload, timeout=30.0)
 
         except Exception as e:
-            print(f"[CLIENT] Failed to log conversation: {e}")
-
-    def health_check(self) -> Dict[str, Any]:
-        """Check if the Databricks endpoint is healthy."""
-        import requests
+            logger.warning("Failed to log %d conversation turn(s): %s", len(rows), e)
 
+    async def health_check(self) -> Dict[str, Any]:
+        """Check if the Databricks endpoint is healthy.
+        Also opens a pooled connection, so calling it at startup warms the client."""
         try:
             url = f"{self.host}/api/2.0/serving-endpoints/{self.endpoint_name}"
-            resp = requests.get(url, headers=self.headers, timeout=10)
+            resp = await self._http.get(url, timeout=10.0)
             if resp.status_code == 200:
                 data = resp.json()
                 state = data.get("state", {}).get("ready", "UNKNOWN")
@@ -133,6 +279,38 @@ class DatabricksAgentClient:
 
 # ─── Lakebase Session Store ─────────────────────────────────────────
 
+# Hot statements, kept as fixed text so asyncpg's per-connection statement
+# cache prepares each once and reuses the server-side plan
+# Upsert the session and read its recent history in one round trip: a
+# data-modifying CTE always runs, even though the SELECT does not read it
+SESSION_HISTORY_SQL = """
+    WITH upsert AS (
+        INSERT INTO sessions (session_id, farmer_id, channel)
+        VALUES ($1, $2, $3)
+        ON CONFLICT (session_id) DO UPDATE SET last_active = NOW()
+    )
+    SELECT role, content FROM messages
+    WHERE session_id = $1
+    ORDER BY created_at DESC LIMIT 10
+"""
+INSERT_MESSAGE_SQL = """
+    INSERT INTO messages (session_id, role, content, metadata)
+    VALUES ($1, $2, $3, $4)
+"""
+
+
+async def _register_jsonb(conn) -> None:
+    """Encode JSONB parameters with orjson so callers can pass dicts directly.
+    The binary JSONB format is the JSON text behind a one-byte version prefix."""
+    await conn.set_type_codec(
+        "jsonb",
+        schema="pg_catalog",
+        encoder=lambda value: b"\x01" + orjson.dumps(value),
+        decoder=lambda data: orjson.loads(data[1:]),
+        format="binary",
+    )
+
+
 class LakebaseSessionStore:
     """
     Session store using Databricks Lakebase (Serverless PostgreSQL).
@@ -145,6 +323,11 @@ class LakebaseSessionStore:
         self.dbname = os.getenv("LAKEBASE_DB", "agrisarthi")
         self.user = os.getenv("LAKEBASE_USER", "")
         self.password = os.getenv("LAKEBASE_PASSWORD", "")
+        self.pool_min = int(os.getenv("LAKEBASE_POOL_MIN", "5"))
+        self.pool_max = int(os.getenv("LAKEBASE_POOL_MAX", "40"))
+        # Behind PgBouncer in transaction mode prepared statements don't survive
+        # across transactions, so the cache must be turned off (set to 0)
+        self.statement_cache_size = int(os.getenv("LAKEBASE_STATEMENT_CACHE", "1024"))
         self._pool = None
 
     async def initialize(self):
@@ -158,9 +341,13 @@ class LakebaseSessionStore:
                 database=self.dbname,
                 user=self.user,
                 password=self.password,
-                min_size=2,
-                max_size=10,
+                min_size=self.pool_min,
+                max_size=self.pool_max,
+                max_inactive_connection_lifetime=60,
+                command_timeout=5,
                 ssl="require",
+                statement_cache_size=self.statement_cache_size,
+                init=_register_jsonb,
             )
 
             async with self._pool.acquire() as conn:
@@ -189,13 +376,13 @@ class LakebaseSessionStore:
                     ON messages(session_id, created_at)
                 """)
 
-            print("[CLIENT] Lakebase session store initialized")
+            logger.info("Lakebase session store initialized")
 
         except ImportError:
-            print("[CLIENT] asyncpg not installed — Lakebase disabled")
+            logger.warning("asyncpg not installed — Lakebase disabled")
             self._pool = None
         except Exception as e:
-            print(f"[CLIENT] Lakebase connection failed: {e}")
+            logger.warning("Lakebase connection failed: %s", e)
             self._pool = None
 
     async def get_or_create_session(
@@ -206,25 +393,7 @@ class LakebaseSessionStore:
             return {"session_id": session_id, "history": []}
 
         async with self._pool.acquire() as conn:
-            await conn.execute(
-                """
-                INSERT INTO sessions (session_id, farmer_id, channel)
-                VALUES ($1, $2, $3)
-                ON CONFLICT (session_id) DO UPDATE SET last_active = NOW()
-            """,
-                session_id,
-                farmer_id,
-                channel,
-            )
-
-            rows = await conn.fetch(
-                """
-                SELECT role, content FROM messages
-                WHERE session_id = $1
-                ORDER BY created_at DESC LIMIT 10
-            """,
-                session_id,
-            )
+            rows = await conn.fetch(SESSION_HISTORY_SQL, session_id, farmer_id, channel)
 
             history = [{"role": r["role"], "content": r["content"]} for r in reversed(rows)]
             return {"session_id": session_id, "history": history}
@@ -238,14 +407,21 @@ class LakebaseSessionStore:
 
         async with self._pool.acquire() as conn:
             await conn.execute(
-                """
-                INSERT INTO messages (session_id, role, content, metadata)
-                VALUES ($1, $2, $3, $4)
-            """,
-                session_id,
-                role,
-                content,
-                json.dumps(metadata or {}),
+                INSERT_MESSAGE_SQL, session_id, role, content, metadata or {}
+            )
+
+    async def add_messages(
+        self, session_id: str, messages: List[Tuple[str, str, Optional[dict]]]
+    ) -> None:
+        """Add several (role, content, metadata) messages in one transaction."""
+        if not self._pool:
+            return
+
+        async with self._pool.acquire() as conn, conn.transaction():
+            await conn.executemany(
+                INSERT_MESSAGE_SQL,
+                [(session_id, role, content, metadata or {})
+                 for role, content, metadata in messages],
             )
 
     async def close(self):
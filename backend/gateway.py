@@ -6,18 +6,28 @@ Run from project root:
     uvicorn backend.gateway:app --reload --host 0.0.0.0 --port 8000
 """
 import os
-import json
 import time
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 
+import httpx
+import orjson
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
 from fastapi import FastAPI, WebSocket, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, Response
-from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from fastapi.responses import StreamingResponse, Response, ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field
 
 from backend.client import DatabricksAgentClient, LakebaseSessionStore
 
@@ -33,9 +43,9 @@ try:
     )
     from backend.voice.models import VoiceCallCreate
     voice_routes_enabled = True
-    print("[BACKEND] Voice agent imports successful")
+    logger.info("Voice agent imports successful")
 except Exception as e:
-    print(f"[BACKEND] Voice routes disabled: {e}")
+    logger.warning("Voice routes disabled: %s", e)
 
 # ─── Initialize clients ────────────────────────────────────────────
 agent_client = None
@@ -46,25 +56,43 @@ session_store = None
 async def lifespan(app: FastAPI):
     """Initialize and cleanup resources."""
     global agent_client, session_store
+    app.state.bg_tasks = set()
+    # uvicorn[standard] picks uvloop + httptools automatically where available
+    logger.info("Event loop: %s", type(asyncio.get_running_loop()).__module__)
 
     try:
         agent_client = DatabricksAgentClient()
-        health = agent_client.health_check()
-        print(f"[BACKEND] Databricks agent client: {health}")
+        agent_client.start()
+        health = await agent_client.health_check()
+        logger.info("Databricks agent client: %s", health)
     except Exception as e:
-        print(f"[BACKEND] Databricks agent client failed: {e}")
+        logger.error("Databricks agent client failed: %s", e)
 
     try:
         session_store = LakebaseSessionStore()
         await session_store.initialize()
     except Exception as e:
-        print(f"[BACKEND] Lakebase session store failed: {e}")
+        logger.warning("Lakebase session store failed: %s", e)
         session_store = None
 
+    # Shared by the Sarvam proxy routes so each call reuses a warm connection
+    app.state.sarvam_client = httpx.AsyncClient(
+        http2=True,
+        base_url=SARVAM_API_BASE,
+        headers={"api-subscription-key": SARVAM_API_KEY, "Content-Type": "application/json"},
+        timeout=httpx.Timeout(30.0, connect=5.0),
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100, keepalive_expiry=60.0),
+    )
+
     yield
 
+    # Let pending conversation writes finish before their clients close
+    await asyncio.gather(*app.state.bg_tasks, return_exceptions=True)
+    await app.state.sarvam_client.aclose()
     if session_store:
         await session_store.close()
+    if agent_client:
+        await agent_client.close()
 
 
 # ─── FastAPI App ────────────────────────────────────────────────────
@@ -72,11 +100,15 @@ app = FastAPI(
     title="AgriSarthi — Databricks-Powered Farming Assistant",
     version="2.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+# Explicit origins: a wildcard is not valid alongside credentials
+CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",") if o.strip()]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -85,33 +117,63 @@ app.add_middleware(
 
 # ─── Request Models ─────────────────────────────────────────────────
 class ChatRequest(BaseModel):
-    message: str
-    thread_id: str = "default"
-    language: str = "en-IN"
-    channel: str = "web"
+    # Bounded fields reject oversized payloads before they reach the agent
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+    message: str = Field(..., max_length=8192)
+    thread_id: str = Field("default", max_length=128)
+    language: str = Field("en-IN", max_length=16)
+    channel: str = Field("web", max_length=32)
 
 
 # ─── Chat Endpoint ──────────────────────────────────────────────────
 
+def run_in_background(coro) -> None:
+    """Run a post-response write without holding the response open."""
+    task = asyncio.create_task(coro)
+    app.state.bg_tasks.add(task)
+    task.add_done_callback(app.state.bg_tasks.discard)
+
+
+async def store_turn(thread_id: str, user_message: str, agent_response: str):
+    """Append one user/assistant exchange to the session store."""
+    try:
+        await session_store.add_messages(
+            thread_id, [("user", user_message, None), ("assistant", agent_response, None)]
+        )
+    except Exception as e:
+        logger.warning("Failed to store turn for %s: %s", thread_id, e)
+
+
+# Fixed framing around each streamed chunk; only the chunk itself is JSON-encoded
+SSE_CONTENT_PREFIX = b'data: {"content":'
+SSE_CONTENT_SUFFIX = b"}\n\n"
+CHAT_STREAM_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "Content-Type": "text/plain; charset=utf-8",
+}
+
+
 async def stream_generator(
     thread_id: str, user_message: str, language: str = "en-IN", channel: str = "web"
 ):
     """Generate streaming response from Databricks agent."""
-    start_time = time.time()
+    start_ns = time.monotonic_ns()
     full_response = ""
 
     try:
         if agent_client:
-            async for chunk in agent_client.invoke_streaming(user_message, thread_id):
+            async for chunk in agent_client.invoke_streaming(user_message, thread_id, language):
                 full_response += chunk
-                yield f"data: {json.dumps({'content': chunk})}\n\n"
+                yield SSE_CONTENT_PREFIX + orjson.dumps(chunk) + SSE_CONTENT_SUFFIX
         else:
             error_msg = "Agent not available. Please configure DATABRICKS_HOST and DATABRICKS_TOKEN."
-            yield f"data: {json.dumps({'content': error_msg})}\n\n"
+            yield SSE_CONTENT_PREFIX + orjson.dumps(error_msg) + SSE_CONTENT_SUFFIX
 
-        yield "data: [DONE]\n\n"
+        yield b"data: [DONE]\n\n"
 
-        elapsed_ms = (time.time() - start_time) * 1000
+        elapsed_ms = (time.monotonic_ns() - start_ns) / 1e6
         if agent_client and full_response:
             await agent_client.log_conversation(
                 session_id=thread_id,
@@ -124,12 +186,11 @@ async def stream_generator(
             )
 
         if session_store:
-            await session_store.add_message(thread_id, "user", user_message)
-            await session_store.add_message(thread_id, "assistant", full_response)
+            run_in_background(store_turn(thread_id, user_message, full_response))
 
     except Exception as e:
-        print(f"[BACKEND] Error in stream_generator: {e}")
-        yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        logger.error("Error in stream_generator: %s", e)
+        yield b"data: " + orjson.dumps({"error": str(e)}) + b"\n\n"
 
 
 @app.post("/chat")
@@ -138,26 +199,22 @@ async def chat_endpoint(request: ChatRequest):
     return StreamingResponse(
         stream_generator(request.thread_id, request.message, request.language, request.channel),
         media_type="text/plain",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Content-Type": "text/plain; charset=utf-8",
-        },
+        headers=CHAT_STREAM_HEADERS,
     )
 
 
 @app.post("/chat/sync")
 async def chat_sync_endpoint(request: ChatRequest):
     """Synchronous chat endpoint — returns full response at once."""
-    start_time = time.time()
+    start_ns = time.monotonic_ns()
 
     try:
         if agent_client:
-            response = await agent_client.invoke(request.message, request.thread_id)
+            response = await agent_client.invoke(request.message, request.thread_id, request.language)
         else:
             response = "Agent not available. Configure Databricks connection."
 
-        elapsed_ms = (time.time() - start_time) * 1000
+        elapsed_ms = (time.monotonic_ns() - start_ns) / 1e6
 
         if agent_client:
             await agent_client.log_conversation(
@@ -182,8 +239,6 @@ async def chat_sync_endpoint(request: ChatRequest):
 
 # ─── Sarvam AI Proxy (avoids CORS issues from browser) ─────────────
 
-import httpx
-
 SARVAM_API_KEY = os.getenv("SARVAM_API_KEY", "")
 SARVAM_API_BASE = "https://api.sarvam.ai"
 
@@ -214,34 +269,27 @@ async def translate_proxy(request: TranslateRequest):
     if not SARVAM_API_KEY:
         return {"error": "Sarvam API key not configured"}
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        resp = await client.post(
-            f"{SARVAM_API_BASE}/translate",
-            headers={
-                "api-subscription-key": SARVAM_API_KEY,
-                "Content-Type": "application/json",
-            },
-            json=request.dict(),
-        )
-        return resp.json()
+    resp = await app.state.sarvam_client.post("/translate", content=request.model_dump_json())
+    return orjson.loads(resp.content)
 
 
 @app.post("/api/tts")
 async def tts_proxy(request: TTSRequest):
-    """Proxy TTS requests to Sarvam AI to avoid CORS issues."""
+    """Proxy TTS requests to Sarvam AI to avoid CORS issues.
+    The upstream body (base64 audio in JSON) is relayed as it arrives, never parsed."""
     if not SARVAM_API_KEY:
         return {"error": "Sarvam API key not configured"}
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        resp = await client.post(
-            f"{SARVAM_API_BASE}/text-to-speech",
-            headers={
-                "api-subscription-key": SARVAM_API_KEY,
-                "Content-Type": "application/json",
-            },
-            json=request.dict(),
-        )
-        return resp.json()
+    client = app.state.sarvam_client
+    upstream = await client.send(
+        client.build_request("POST", "/text-to-speech", content=request.model_dump_json()), stream=True
+    )
+    return StreamingResponse(
+        upstream.aiter_bytes(),
+        status_code=upstream.status_code,
+        media_type=upstream.headers.get("content-type", "application/json"),
+        background=BackgroundTask(upstream.aclose),
+    )
 
 
 # ─── Voice Endpoints ────────────────────────────────────────────────
@@ -255,7 +303,7 @@ async def voice_websocket_endpoint(websocket: WebSocket):
     try:
         await voice_websocket_handler(websocket)
     except Exception as e:
-        print(f"[BACKEND] WebSocket error: {e}")
+        logger.error("WebSocket error: %s", e)
         try:
             await websocket.close(code=1011, reason="Internal server error")
         except Exception:
@@ -307,22 +355,26 @@ async def call_transcript_endpoint(call_id: str):
 
 # ─── Health & Status ────────────────────────────────────────────────
 
+# Static service banner, serialized once at import
+ROOT_BODY = orjson.dumps({
+    "service": "AgriSarthi — Databricks-Powered Farming Assistant",
+    "status": "active",
+    "version": "2.0.0",
+    "channels": ["Web Chat", "Voice (Twilio)", "WhatsApp"],
+    "powered_by": "Databricks Mosaic AI + Model Serving",
+})
+
+
 @app.get("/")
 def read_root():
-    return {
-        "service": "AgriSarthi — Databricks-Powered Farming Assistant",
-        "status": "active",
-        "version": "2.0.0",
-        "channels": ["Web Chat", "Voice (Twilio)", "WhatsApp"],
-        "powered_by": "Databricks Mosaic AI + Model Serving",
-    }
+    return Response(content=ROOT_BODY, media_type="application/json")
 
 
 @app.get("/health")
-def health_check():
+async def health_check():
     databricks_status = "unknown"
     if agent_client:
-        health = agent_client.health_check()
+        health = await agent_client.health_check()
         databricks_status = health.get("status", "unknown")
 
     return {
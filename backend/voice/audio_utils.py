@@ -26,7 +26,7 @@ def is_silence(audio_data: bytes) -> bool:
         rms = audioop.rms(pcm_data, 2)
         return rms < SILENCE_THRESHOLD
     except Exception as e:
-        logger.error(f"Silence check error: {e}")
+        logger.error("Silence check error: %s", e)
         return True
 
 
@@ -51,7 +51,7 @@ def mulaw_chunks_to_wav(audio_chunks: list[bytes], target_rate: int = 16000) ->
             wf.writeframes(pcm_data)
         return buf.getvalue()
     except Exception as e:
-        logger.error(f"mulaw->WAV conversion error: {e}")
+        logger.error("mulaw->WAV conversion error: %s", e)
         raise
 
 
@@ -84,5 +84,5 @@ def wav_to_mulaw(wav_data: bytes) -> list[str]:
 
         return chunks
     except Exception as e:
-        logger.error(f"WAV->mulaw conversion error: {e}")
+        logger.error("WAV->mulaw conversion error: %s", e)
         return []
@@ -46,13 +46,13 @@ async def speech_to_text_translate(wav_data: bytes) -> Tuple[Optional[str], Opti
                 lang = result.get("language_code", "en-IN")
                 if not transcript:
                     return None, None
-                logger.info(f"STT: '{transcript}' (lang={lang})")
+                logger.info("STT: '%s' (lang=%s)", transcript, lang)
                 return transcript, lang
             else:
-                logger.error(f"STT error {resp.status_code}: {resp.text[:200]}")
+                logger.error("STT error %s: %s", resp.status_code, resp.text[:200])
                 return None, None
     except Exception as e:
-        logger.error(f"STT exception: {e}")
+        logger.error("STT exception: %s", e)
         return None, None
     finally:
         if fh:
@@ -95,10 +95,10 @@ async def translate_text(
             )
             if resp.status_code == 200:
                 return resp.json().get("translated_text", text).strip()
-            logger.error(f"Translate error {resp.status_code}: {resp.text[:200]}")
+            logger.error("Translate error %s: %s", resp.status_code, resp.text[:200])
             return text
     except Exception as e:
-        logger.error(f"Translate exception: {e}")
+        logger.error("Translate exception: %s", e)
         return text
 
 
@@ -141,8 +141,8 @@ async def text_to_speech(
                     return audios[0]
                 logger.error("TTS returned no audio")
                 return None
-            logger.error(f"TTS error {resp.status_code}: {resp.text[:200]}")
+            logger.error("TTS error %s: %s", resp.status_code, resp.text[:200])
             return None
     except Exception as e:
-        logger.error(f"TTS exception: {e}")
+        logger.error("TTS exception: %s", e)
         return None
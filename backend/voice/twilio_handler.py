@@ -6,13 +6,13 @@ Flow:
   Sarvam STT -> Databricks Agent -> Sarvam TTS -> mu-law chunks -> Twilio playback
 """
 import os
-import json
 import asyncio
 import base64
 import logging
 import time
 from typing import Optional, Dict, List
 
+import orjson
 from fastapi import WebSocket, WebSocketDisconnect
 from starlette.websockets import WebSocketState
 
@@ -39,6 +39,19 @@ GREETING_TEXT = (
 )
 GREETING_LANG = "hi-IN"
 
+# Read once at import; these don't change while the gateway runs
+DATABRICKS_HOST = os.getenv("DATABRICKS_HOST", "")
+DATABRICKS_TOKEN = os.getenv("DATABRICKS_TOKEN", "")
+SQL_WAREHOUSE_ID = os.getenv("DATABRICKS_SQL_WAREHOUSE_ID", "")
+AGENT_URL = (
+    f"{DATABRICKS_HOST}/serving-endpoints/"
+    f"{os.getenv('DATABRICKS_AGENT_ENDPOINT', 'agents_agrisarthi-main-agrisarthi_agent')}/invocations"
+)
+DATABRICKS_HEADERS = {
+    "Authorization": f"Bearer {DATABRICKS_TOKEN}",
+    "Content-Type": "application/json",
+}
+
 
 # ── SQL Warehouse warmup ──────────────────────────────────────────────────
 async def _warmup_sql_warehouse():
@@ -46,20 +59,17 @@ async def _warmup_sql_warehouse():
     try:
         import httpx
 
-        host = os.getenv("DATABRICKS_HOST", "")
-        token = os.getenv("DATABRICKS_TOKEN", "")
-        wid = os.getenv("DATABRICKS_SQL_WAREHOUSE_ID", "")
-        if not all([host, token, wid]):
+        if not all([DATABRICKS_HOST, DATABRICKS_TOKEN, SQL_WAREHOUSE_ID]):
             return
         async with httpx.AsyncClient(timeout=30.0) as client:
             resp = await client.post(
-                f"{host}/api/2.0/sql/statements",
-                headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
-                json={"warehouse_id": wid, "statement": "SELECT 1", "wait_timeout": "30s"},
+                f"{DATABRICKS_HOST}/api/2.0/sql/statements",
+                headers=DATABRICKS_HEADERS,
+                json={"warehouse_id": SQL_WAREHOUSE_ID, "statement": "SELECT 1", "wait_timeout": "30s"},
             )
-            logger.info(f"SQL warehouse warmup: {resp.status_code}")
+            logger.info("SQL warehouse warmup: %s", resp.status_code)
     except Exception as e:
-        logger.warning(f"Warehouse warmup error (non-fatal): {e}")
+        logger.warning("Warehouse warmup error (non-fatal): %s", e)
 
 
 # ── Databricks Agent helper ──────────────────────────────────────────────
@@ -70,20 +80,10 @@ async def _invoke_agent(text: str, retry: bool = True) -> str:
 
         await _warmup_sql_warehouse()
 
-        host = os.getenv("DATABRICKS_HOST", "")
-        token = os.getenv("DATABRICKS_TOKEN", "")
-        endpoint = os.getenv(
-            "DATABRICKS_AGENT_ENDPOINT", "agents_agrisarthi-main-agrisarthi_agent"
-        )
-        url = f"{host}/serving-endpoints/{endpoint}/invocations"
         payload = {"messages": [{"role": "user", "content": text}]}
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json",
-        }
 
         async with httpx.AsyncClient(timeout=120.0) as client:
-            resp = await client.post(url, json=payload, headers=headers)
+            resp = await client.post(AGENT_URL, json=payload, headers=DATABRICKS_HEADERS)
             if resp.status_code == 200:
                 data = resp.json()
                 messages = data.get("messages", [])
@@ -110,10 +110,10 @@ async def _invoke_agent(text: str, retry: bool = True) -> str:
                     return choices[0].get("message", {}).get("content", "I'm having trouble responding right now.")
                 return data.get("output", "I'm having trouble responding right now.")
 
-            logger.error(f"Agent error {resp.status_code}: {resp.text[:300]}")
+            logger.error("Agent error %s: %s", resp.status_code, resp.text[:300])
             return "Sorry, I am facing a technical issue. Please try again."
     except Exception as e:
-        logger.error(f"Agent exception: {e}")
+        logger.error("Agent exception: %s", e)
         return "Sorry, I am facing a technical issue. Please try again."
 
 
@@ -129,7 +129,7 @@ async def _send_audio_to_twilio(
             "media": {"payload": chunk},
         }
         try:
-            await websocket.send_text(json.dumps(msg))
+            await websocket.send_text(orjson.dumps(msg).decode())
             await asyncio.sleep(0.02)
         except Exception:
             break
@@ -138,7 +138,7 @@ async def _send_audio_to_twilio(
 async def _send_clear(websocket: WebSocket, stream_sid: str):
     """Send clear event to stop any queued Twilio audio."""
     try:
-        await websocket.send_text(json.dumps({"event": "clear", "streamSid": stream_sid}))
+        await websocket.send_text(orjson.dumps({"event": "clear", "streamSid": stream_sid}).decode())
     except Exception:
         pass
 
@@ -152,7 +152,7 @@ async def _process_audio(
 ):
     """Convert collected audio to text, query agent, synthesize reply."""
     try:
-        logger.info(f"Processing {len(audio_chunks)} audio chunks...")
+        logger.debug("Processing %d audio chunks...", len(audio_chunks))
 
         wav_data = mulaw_chunks_to_wav(audio_chunks)
         if wav_data is None:
@@ -164,7 +164,7 @@ async def _process_audio(
             logger.info("STT returned empty — ignoring")
             return
 
-        logger.info(f"Farmer said ({lang}): {transcript}")
+        logger.info("Farmer said (%s): %s", lang, transcript)
 
         if call_sid not in call_transcripts:
             call_transcripts[call_sid] = []
@@ -173,7 +173,7 @@ async def _process_audio(
         })
 
         agent_response = await _invoke_agent(transcript)
-        logger.info(f"Agent: {agent_response[:150]}")
+        logger.info("Agent: %s", agent_response[:150])
 
         call_transcripts[call_sid].append({
             "role": "agent", "text": agent_response, "language": "en-IN",
@@ -191,13 +191,13 @@ async def _process_audio(
             logger.error("WAV->mulaw conversion failed")
             return
 
-        logger.info(f"Sending {len(mulaw_chunks)} response chunks to Twilio")
+        logger.debug("Sending %d response chunks to Twilio", len(mulaw_chunks))
         await _send_clear(websocket, stream_sid)
         await _send_audio_to_twilio(websocket, mulaw_chunks, stream_sid)
-        logger.info("Response audio sent")
+        logger.debug("Response audio sent")
 
     except Exception as e:
-        logger.error(f"_process_audio error: {e}", exc_info=True)
+        logger.error("_process_audio error: %s", e, exc_info=True)
 
 
 # ── WebSocket handler ────────────────────────────────────────────────────
@@ -216,17 +216,17 @@ async def handle_media_stream(websocket: WebSocket):
     try:
         while True:
             raw = await websocket.receive_text()
-            msg = json.loads(raw)
+            msg = orjson.loads(raw)
             event = msg.get("event", "")
 
             if event == "connected":
-                logger.info(f"Twilio stream connected")
+                logger.info("Twilio stream connected")
 
             elif event == "start":
                 start_data = msg.get("start", {})
                 stream_sid = start_data.get("streamSid")
                 call_sid = start_data.get("callSid", f"call_{int(time.time())}")
-                logger.info(f"Call started: sid={call_sid}, stream={stream_sid}")
+                logger.info("Call started: sid=%s, stream=%s", call_sid, stream_sid)
 
                 call_history.append({
                     "call_sid": call_sid,
@@ -248,7 +248,7 @@ async def handle_media_stream(websocket: WebSocket):
                                 await _send_audio_to_twilio(websocket, mulaw_chunks, stream_sid)
                                 logger.info("Greeting sent")
                     except Exception as e:
-                        logger.error(f"Greeting error: {e}")
+                        logger.error("Greeting error: %s", e)
 
             elif event == "media":
                 if not stream_sid:
@@ -258,7 +258,7 @@ async def handle_media_stream(websocket: WebSocket):
                     continue
 
                 audio_data = base64.b64decode(payload)
-                now = time.time()
+                now = time.monotonic()
 
                 if is_silence(audio_data):
                     if is_speaking:
@@ -293,7 +293,7 @@ async def handle_media_stream(websocket: WebSocket):
                         silence_start = None
 
             elif event == "stop":
-                logger.info(f"Call ended: {call_sid}")
+                logger.info("Call ended: %s", call_sid)
                 for rec in call_history:
                     if rec.get("call_sid") == call_sid:
                         rec["end_time"] = time.strftime("%Y-%m-%d %H:%M:%S")
@@ -301,9 +301,9 @@ async def handle_media_stream(websocket: WebSocket):
                 break
 
     except WebSocketDisconnect:
-        logger.info(f"WebSocket disconnected: {call_sid}")
+        logger.info("WebSocket disconnected: %s", call_sid)
     except Exception as e:
-        logger.error(f"WebSocket error: {e}", exc_info=True)
+        logger.error("WebSocket error: %s", e, exc_info=True)
     finally:
         for rec in call_history:
             if rec.get("call_sid") == call_sid and rec["status"] == "in-progress":
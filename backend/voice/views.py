@@ -38,7 +38,7 @@ async def handle_incoming_call(request: Request) -> Response:
     scheme = "wss" if proto == "https" else "ws"
     ws_url = f"{scheme}://{host}/ws/voice-stream"
 
-    logger.info(f"TwiML WebSocket URL: {ws_url}")
+    logger.info("TwiML WebSocket URL: %s", ws_url)
     twiml = generate_incoming_call_twiml(ws_url)
     return Response(content=twiml, media_type="application/xml")
 
@@ -77,7 +77,7 @@ async def create_outbound_call(call_data: VoiceCallCreate) -> dict:
                 return {"call_sid": result.get("sid"), "status": result.get("status")}
             return {"error": f"Twilio API error {resp.status_code}: {resp.text[:200]}"}
     except Exception as e:
-        logger.error(f"Outbound call error: {e}")
+        logger.error("Outbound call error: %s", e)
         return {"error": str(e)}
 
 
@@ -20,19 +20,31 @@ Databricks tech used: Mosaic AI, Agent Bricks, AI Gateway, Model Serving, MLflow
 
 # COMMAND ----------
 
-# MAGIC %pip install databricks-agents databricks-vectorsearch databricks-sdk mlflow langchain langgraph langchain-community --quiet
+# MAGIC %pip install databricks-agents databricks-vectorsearch databricks-sdk mlflow langchain "langgraph>=0.3,<1.3" "langgraph-checkpoint>=2,<5" langchain-community --quiet
 # MAGIC %restart_python
 
 # COMMAND ----------
 
 import os
+import re
+import time
+import queue
+import asyncio
+import hashlib
+import threading
 import mlflow
-from typing import Annotated, List, Literal
-from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Annotated, List
+from langchain_core.messages import BaseMessage, AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
 from langchain_community.chat_models import ChatDatabricks
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolNode
 from langgraph.graph.message import add_messages
+from langgraph.types import Send
+from langgraph.checkpoint.memory import MemorySaver
 from typing_extensions import TypedDict
 
 # ─── MLflow Setup ───────────────────────────────────────────────────
@@ -59,6 +71,22 @@ llm = ChatDatabricks(
     temperature=0,
 )
 
+# Routing only needs one agent name back: a small model with a short output budget
+# answers much sooner than the 70B model. Agent names are single words, so
+# decoding stops at the first space or newline.
+ROUTER_STOP = ["\n", " "]
+llm_router = ChatDatabricks(
+    endpoint="databricks-meta-llama-3-1-8b-instruct",
+    temperature=0,
+    max_tokens=8,
+)
+
+# temperature=0, so an identical prompt (system prompt, history and tool results
+# included) gets the same completion: answer repeats from memory
+from langchain_core.caches import InMemoryCache
+from langchain_core.globals import set_llm_cache
+set_llm_cache(InMemoryCache(maxsize=4096))
+
 print("✅ LLM initialized via Databricks AI Gateway (Llama 3.1 70B)")
 
 # COMMAND ----------
@@ -68,9 +96,18 @@ print("✅ LLM initialized via Databricks AI Gateway (Llama 3.1 70B)")
 # %run ./02_agent_tools
 
 # For the agent framework, we wrap tools as LangChain tools
+import requests
+from requests.adapters import HTTPAdapter
 from langchain.tools import tool as langchain_tool
 from pydantic import BaseModel, Field
 
+# One pooled session for every tool's HTTP calls, so repeat requests to the same
+# host reuse an open keep-alive connection instead of a fresh TCP + TLS handshake.
+# Sized for the tools running concurrently across parallel specialists.
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=32))
+http_session.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=32))
+
 class SoilToolInput(BaseModel):
     query: str = Field(description="Query about soil, crops, or location in India")
 
@@ -93,26 +130,36 @@ class CropRecToolInput(BaseModel):
     season: str = Field(default="kharif", description="Crop season")
 
 
+@lru_cache(maxsize=1)
+def soil_index():
+    """Vector Search index handle, created on first use and reused by every call."""
+    from databricks.vector_search.client import VectorSearchClient
+    return VectorSearchClient().get_index(
+        endpoint_name="agrisarthi-vs-endpoint",
+        index_name="agrisarthi.main.soil_vector_index"
+    )
+
+
+@lru_cache(maxsize=1024)
+def search_soil(query: str) -> tuple[str, ...]:
+    """soil_text of the top matches. Cached: soil data only changes on a triggered
+    index sync, so repeated questions skip the embedding + search round-trip."""
+    results = soil_index().similarity_search(
+        query_text=query,
+        columns=["state", "district", "soil_type", "ph", "soil_text"],
+        num_results=3
+    )
+    return tuple(row[-1] for row in results.get("result", {}).get("data_array", []))
+
+
 @langchain_tool("soil_data_retriever", args_schema=SoilToolInput)
 def soil_data_retriever_tool(query: str) -> str:
     """Searches soil database via Vector Search for soil composition, nutrients, and crop suitability."""
-    from databricks.vector_search.client import VectorSearchClient
-    vsc = VectorSearchClient()
-    
     try:
-        index = vsc.get_index(
-            endpoint_name="agrisarthi-vs-endpoint",
-            index_name="agrisarthi.main.soil_vector_index"
-        )
-        results = index.similarity_search(
-            query_text=query,
-            columns=["state", "district", "soil_type", "ph", "soil_text"],
-            num_results=3
-        )
-        data_array = results.get("result", {}).get("data_array", [])
-        if not data_array:
+        soil_texts = search_soil(" ".join(query.lower().split()))
+        if not soil_texts:
             return f"No soil data found for '{query}'."
-        return "\n\n".join([row[-1] for row in data_array])
+        return "\n\n".join(soil_texts)
     except Exception as e:
         return f"Error: {e}"
 
@@ -142,12 +189,11 @@ def market_price_langchain_tool(crop_name: str, location: str) -> str:
 @langchain_tool("weather_alert_tool", args_schema=WeatherToolInput)
 def weather_alert_langchain_tool(location: str) -> str:
     """Fetches weather forecast from OpenWeatherMap."""
-    import requests
     api_key = os.getenv("OPENWEATHERMAP_API_KEY")
     if not api_key:
         return "Weather unavailable — API key not set."
     try:
-        resp = requests.get(
+        resp = http_session.get(
             "http://api.openweathermap.org/data/2.5/weather",
             params={"q": location, "appid": api_key, "units": "metric"},
             timeout=5
@@ -164,9 +210,8 @@ def weather_alert_langchain_tool(location: str) -> str:
 @langchain_tool("disaster_alert_tool", args_schema=DisasterToolInput)
 def disaster_alert_langchain_tool(location: str) -> str:
     """Fetches disaster alerts from NDMA (National Disaster Management Authority)."""
-    import requests
     try:
-        resp = requests.post(
+        resp = http_session.post(
             "https://sachet.ndma.gov.in/cap_public_website/FetchAddressWiseAlerts",
             data={"address": location, "radius": 50},
             headers={"Accept": "application/json", "Content-Type": "application/x-www-form-urlencoded"},
@@ -244,27 +289,94 @@ print(f"✅ {len(all_tools)} LangChain tools created for agent")
 
 # ─── Agent State ────────────────────────────────────────────────────
 
-class AgentState(TypedDict):
-    messages: Annotated[list[BaseMessage], add_messages]
-    next_agent: Literal["Supervisor", "SoilCropAdvisor", "MarketAnalyst", 
-                        "FinancialAdvisor", "FinalAnswerAgent", "end"]
+# Upper bound on the messages carried in state; older ones are dropped as new ones arrive
+MAX_STATE_MESSAGES = 32
+
 
-# ─── Bind tools to LLM ─────────────────────────────────────────────
-llm_with_tools = llm.bind_tools(all_tools)
-tool_node = ToolNode(all_tools)
+def bounded_add_messages(left: list, right: list) -> list:
+    """add_messages, keeping only the newest MAX_STATE_MESSAGES and never
+    starting on an orphaned tool result."""
+    merged = add_messages(left, right)
+    start = max(0, len(merged) - MAX_STATE_MESSAGES)
+    while start < len(merged) and isinstance(merged[start], ToolMessage):
+        start += 1
+    return merged[start:]
 
-print("✅ Tools bound to LLM via AI Gateway")
+
+def merge_tool_calls(left: list, right: list) -> list:
+    """Accumulate tool calls from parallel specialists; an empty update clears them."""
+    return (left or []) + right if right else []
+
+
+class AgentState(TypedDict, total=False):
+    messages: Annotated[list[BaseMessage], bounded_add_messages]
+    # Tool calls requested by the specialists this turn, waiting for the tools node
+    pending_calls: Annotated[list[dict], merge_tool_calls]
+    # Specialists the query needs (>1 fans out in parallel), or ["end"] when the Supervisor already replied
+    next_agents: list[str]
+    # Normalized text of the current user message, set once by the Supervisor
+    original_query: str
+
+# ─── Tools per specialist ──────────────────────────────────────────
+# Each specialist is bound only to the tools it uses, so every call carries a
+# smaller tool schema and the model cannot pick another domain's tool.
+AGENT_TOOLS = {
+    "SoilCropAdvisor": [soil_data_retriever_tool, weather_alert_langchain_tool,
+                        disaster_alert_langchain_tool, crop_rec_langchain_tool],
+    "MarketAnalyst": [market_price_langchain_tool],
+    "FinancialAdvisor": [scheme_search_langchain_tool],
+}
+TOOLS_BY_NAME = {t.name: t for t in all_tools}
+
+print("✅ Tool subsets: " + ", ".join(f"{name} ({len(tools)})" for name, tools in AGENT_TOOLS.items()))
 
 # COMMAND ----------
 
 # ─── Supervisor Agent ───────────────────────────────────────────────
-
-def supervisor_agent(state: AgentState):
-    """The Supervisor routes queries to specialist agents."""
-    messages = state['messages']
-    user_input = messages[-1].content
-    
-    prompt = f"""You are the supervisor of AgriSarthi, an AI farming assistant for Indian farmers.
+# Most farmer queries name their domain outright, so a keyword match picks the
+# specialists without an LLM round-trip. A query that matches several domains
+# ("onion price and best fertilizer") fans out to all of them in parallel; the
+# LLM is only asked when no keywords match at all.
+
+SUPERVISOR_KEYWORDS = {
+    "MarketAnalyst": ["price", "prices", "mandi", "rate", "rates", "market", "bhav", "sell", "selling"],
+    "SoilCropAdvisor": ["soil", "crop", "crops", "fertilizer", "fertiliser", "weather", "rain", "rainfall",
+                        "forecast", "disaster", "flood", "cyclone", "drought", "pest", "sow", "sowing",
+                        "irrigation", "seed", "seeds", "harvest"],
+    "FinancialAdvisor": ["loan", "loans", "scheme", "schemes", "subsidy", "subsidies", "pm-kisan", "pm-kusum",
+                         "pmfby", "kcc", "insurance", "credit", "yojana"],
+}
+# Keyword -> specialist, so one tokenization pass scores every specialist with set lookups
+KEYWORD_AGENT = {word: name for name, words in SUPERVISOR_KEYWORDS.items() for word in frozenset(words)}
+# Words, keeping hyphenated names like "pm-kisan" together
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+GREETING_PATTERN = re.compile(r"^(hi|hello|namaste|hey)\b", re.I)
+
+# Bare greetings get a canned reply straight from the Supervisor (no LLM call)
+PURE_GREETINGS = frozenset({"hi", "hello", "hey", "namaste", "hola"})
+GREETING_REPLY = "Namaste! Ask me about crops, mandi prices, or farmer schemes."
+
+# Internal agent names the model sometimes echoes into the farmer-facing answer, removed
+# in one pass: a leading role label in any case or markup ("**MarketAnalyst:** ...") and
+# inline CamelCase mentions. Plain "supervisor" is only stripped as a leading label; the
+# streaming path applies the two halves separately (see clean_answer_stream).
+_AGENT_NAMES = "MarketAnalyst|SoilCropAdvisor|FinancialAdvisor|FinalAnswerAgent"
+_LEAD_ROLE = rf"^\W*(?i:{_AGENT_NAMES}|Supervisor)\b[\s:*\-]*"
+_INLINE_ROLE = rf"\b(?:{_AGENT_NAMES})\b:?[ \t]?"
+_ROLE_RE = re.compile(rf"{_LEAD_ROLE}|{_INLINE_ROLE}")
+_LEAD_ROLE_RE = re.compile(_LEAD_ROLE)
+_INLINE_ROLE_RE = re.compile(_INLINE_ROLE)
+
+
+# LLM routing decisions for queries the keywords could not place (temperature 0, so reusable).
+# Requests run on their own threads, so reads and FIFO eviction share a lock.
+_llm_routes: dict = {}
+_llm_routes_lock = threading.Lock()
+
+
+# Static instructions as a reusable SystemMessage: the endpoint can cache the prefix,
+# only the short query message changes per call
+ROUTER_SYS = SystemMessage(content="""You are the supervisor of AgriSarthi, an AI farming assistant for Indian farmers.
 Route the user's query to the best specialist agent.
 
 Available agents:
@@ -280,37 +392,386 @@ Routing rules:
 - Scheme/subsidy/loan/government → FinancialAdvisor
 - Greeting/general → FinalAnswerAgent
 
-User Query: "{user_input}"
+Respond with ONLY the agent name.""")
 
-Respond with ONLY the agent name."""
+
+async def route_with_llm(user_input: str) -> str:
+    """Ask the LLM to pick a specialist when no keyword matches."""
+    with _llm_routes_lock:
+        known = _llm_routes.get(user_input)
+    if known:
+        return known
+    # Paraphrases of a query the LLM already routed reuse its decision
+    if learned := await llm_route_cache.lookup(user_input, ()):
+        return learned
+    
+    prompt = [ROUTER_SYS, HumanMessage(content=f'User Query: "{user_input}"')]
     
-    response = llm.invoke(prompt)
-    next_agent = response.content.strip()
+    try:
+        response = await llm_router.ainvoke(prompt, stop=ROUTER_STOP)
+    except Exception as e:
+        print(f"⚠️ Router model failed ({e}), falling back to main LLM")
+        response = await llm.ainvoke(prompt, stop=ROUTER_STOP)
+    words = response.content.split()
+    next_agent = words[0].strip("*.:\"'") if words else ""
     
     valid = ["SoilCropAdvisor", "MarketAnalyst", "FinancialAdvisor", "FinalAnswerAgent"]
     if next_agent not in valid:
         next_agent = "FinalAnswerAgent"
     
-    print(f"🎯 Supervisor → {next_agent}")
-    return {"next_agent": next_agent}
+    with _llm_routes_lock:
+        if len(_llm_routes) >= 1024:
+            _llm_routes.pop(next(iter(_llm_routes)), None)
+        _llm_routes[user_input] = next_agent
+    await llm_route_cache.add(user_input, (), next_agent, ttl=86400)
+    return next_agent
+
+
+@lru_cache(maxsize=1024)
+def _route(user_text: str) -> tuple:
+    """Pick the specialists for a normalized query, best match first.
+    Returns an empty tuple when only the LLM can decide."""
+    scores = {}
+    for token in _TOKEN_RE.findall(user_text):
+        # "soil-testing" should still count as "soil"
+        for word in (token, *token.split("-")) if "-" in token else (token,):
+            if name := KEYWORD_AGENT.get(word):
+                scores[name] = scores.get(name, 0) + 1
+    matched = tuple(sorted(scores, key=scores.get, reverse=True))
+    
+    if matched:
+        return matched
+    if GREETING_PATTERN.match(user_text):
+        return ("FinalAnswerAgent",)
+    return ()
 
 
-# ─── Specialist Agent Node ──────────────────────────────────────────
+# ─── Local Embeddings ───────────────────────────────────────────────
+# A small MiniLM model (ONNX Runtime on CPU via fastembed) embeds a query in a few
+# milliseconds. It backs the zero-shot router and the semantic answer cache below;
+# both are skipped when the model is unavailable.
 
-def specialist_agent_node(state: AgentState):
-    """Generic specialist that uses tools via LLM."""
-    print("🔄 Specialist processing with tools...")
-    response = llm_with_tools.invoke(state['messages'])
-    return {"messages": [response]}
+def load_embedding_model(model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    try:
+        from fastembed import TextEmbedding
+        return TextEmbedding(model_name)
+    except Exception as e:
+        print(f"⚠️ Local embeddings disabled: {e}")
+        return None
 
 
-# ─── Final Answer Agent ─────────────────────────────────────────────
+embedding_model = load_embedding_model()
 
-def final_answer_agent(state: AgentState):
-    """Synthesizes the final farmer-friendly response."""
-    print("✍️ Synthesizing final answer...")
+
+@lru_cache(maxsize=1024)
+def embed(text: str) -> np.ndarray:
+    """Unit-length embedding of `text`. Cached: routing, cache lookup and
+    cache insert all embed the same query."""
+    vector = np.asarray(next(iter(embedding_model.embed([text]))), dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def embed_many(texts: list[str]) -> np.ndarray:
+    """Unit-length embeddings of `texts` as rows, computed in one batched model call."""
+    vectors = np.asarray(list(embedding_model.embed(texts)), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+# ─── Zero-shot Router ───────────────────────────────────────────────
+# Queries without a keyword hit (Hinglish, paraphrases) are compared with example
+# queries for each specialist; the LLM is only asked when none is close enough.
+
+ROUTE_EXAMPLES = {
+    "SoilCropAdvisor": ["which crop should i grow this season", "what is the soil type in my district",
+                        "how much fertilizer should i use", "will it rain this week", "is there a flood warning",
+                        "kaunsi fasal ugaun", "mitti ki jaanch kaise karein", "barish kab hogi"],
+    "MarketAnalyst": ["what is the mandi price today", "onion rate in the market", "where can i sell my wheat",
+                      "aaj gehun ka bhav kya hai", "tamatar ka rate kya chal raha hai"],
+    "FinancialAdvisor": ["which government scheme can help me", "how do i get a farm loan",
+                         "subsidy for solar pump", "how to claim crop insurance", "sarkari yojana ki jaankari",
+                         "kisan credit card kaise banega"],
+}
+ROUTE_MIN_SIMILARITY = 0.5
+
+_route_labels = [name for name, examples in ROUTE_EXAMPLES.items() for _ in examples]
+_route_vectors = None
+if embedding_model is not None:
+    _route_vectors = embed_many([q for examples in ROUTE_EXAMPLES.values() for q in examples])
+
+
+async def route_with_embeddings(user_text: str):
+    """Specialist whose examples are closest to the query, or None if none is close enough."""
+    if _route_vectors is None:
+        return None
+    scores = _route_vectors @ await asyncio.to_thread(embed, user_text)
+    best = int(scores.argmax())
+    return _route_labels[best] if scores[best] >= ROUTE_MIN_SIMILARITY else None
+
+
+# ─── Semantic Answer Cache ──────────────────────────────────────────
+# Paraphrases ("onion rate Delhi" vs "price of onion in Delhi") miss every exact-match
+# cache. Near-duplicate recent queries are found by embedding similarity and the
+# Supervisor replies with their answer directly. MiniLM also scores "onion price in
+# Delhi" and "onion price in Pune" as near-duplicates, so a hit additionally needs the
+# same places, crops, schemes and numbers: every token that is not query filler.
+
+_QUERY_FILLER = frozenset("""
+    a an the of in at for to on from and or is are be what whats which how when where
+    me my i we our you your please tell give show about do does can will should much
+    today now current latest price prices rate rates cost mandi market bhav
+    ka ki ke ko kya hai hain aaj mein batao bataiye kitna
+""".split())
+
+
+def query_entities(text: str) -> frozenset:
+    """The subject tokens of a query: places, crops, schemes and numbers."""
+    return frozenset(_TOKEN_RE.findall(text.lower())) - _QUERY_FILLER
+
+
+class SemanticCache:
+    """Cosine-similarity lookup of recent answers, held in a fixed-size ring buffer.
+    Requests run on their own threads and event loops, so the buffer is lock-guarded."""
+    
+    def __init__(self, threshold: float = 0.92, maxsize: int = 10_000, match_entities: bool = True):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.match_entities = match_entities
+        self._vectors = None   # (maxsize, dim) unit vectors; rows past _count are unused
+        self._entries = [None] * maxsize   # (route, entities, answer, expires_at) per row
+        self._count = 0
+        self._next = 0         # oldest row, overwritten first
+        self._lock = threading.Lock()
+    
+    async def lookup(self, text: str, route: tuple):
+        """Return a cached answer for a paraphrase of `text` with the same route
+        (and, if enabled, the same entities), if any."""
+        if embedding_model is None or not self._count:
+            return None
+        vector = await asyncio.to_thread(embed, text)
+        entities = query_entities(text) if self.match_entities else None
+        now = time.monotonic()
+        with self._lock:
+            scores = self._vectors[:self._count] @ vector
+            candidates = np.flatnonzero(scores >= self.threshold)
+            for row in candidates[np.argsort(-scores[candidates])]:
+                cached_route, cached_entities, answer, expires_at = self._entries[row]
+                if cached_route == route and cached_entities == entities and expires_at > now:
+                    return answer
+        return None
+    
+    async def add(self, text: str, route: tuple, answer: str, ttl: int):
+        if embedding_model is None:
+            return
+        vector = await asyncio.to_thread(embed, text)
+        entities = query_entities(text) if self.match_entities else None
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+            self._vectors[self._next] = vector
+            self._entries[self._next] = (route, entities, answer, time.monotonic() + ttl)
+            self._next = (self._next + 1) % self.maxsize
+            self._count = min(self._count + 1, self.maxsize)
+
+
+semantic_cache = SemanticCache()
+# LLM routing decisions; the route key is unused and the route does not depend on entities
+llm_route_cache = SemanticCache(maxsize=4096, match_entities=False)
+
+
+def has_earlier_turns(messages: list) -> bool:
+    """Whether a session checkpoint holds a previous user turn. Cached answers are keyed
+    on the current query alone, so follow-ups ("and in Pune?") neither read nor fill them."""
+    return sum(isinstance(m, HumanMessage) for m in messages) > 1
+
+
+async def supervisor_agent(state: AgentState):
+    """The Supervisor routes queries to specialist agents."""
+    messages = state['messages']
+    user_text = messages[-1].content.strip().lower()
+    
+    if user_text.rstrip("!.") in PURE_GREETINGS:
+        print("🎯 Supervisor → greeting, replying directly")
+        return {"messages": [AIMessage(content=GREETING_REPLY)], "next_agents": ["end"], "original_query": user_text}
+    
+    next_agents = _route(user_text)
+    if not next_agents:
+        next_agents = (await route_with_embeddings(user_text) or await route_with_llm(user_text),)
+    
+    cache = _route.cache_info()
+    print(f"🎯 Supervisor → {', '.join(next_agents)} (route cache: {cache.hits} hits, {cache.misses} misses)")
     
-    synthesis_prompt = f"""You are AgriSarthi, a friendly agricultural assistant for Indian farmers.
+    if not has_earlier_turns(messages) and (cached := await semantic_cache.lookup(user_text, next_agents)):
+        print("⚡ Answered from semantic cache")
+        return {"messages": [AIMessage(content=cached)], "next_agents": ["end"], "original_query": user_text}
+    return {"next_agents": list(next_agents), "original_query": user_text, "pending_calls": []}
+
+
+# ─── Specialist Agent Nodes ─────────────────────────────────────────
+# The system prompts are static so endpoints with automatic prefix caching
+# can reuse them; only the conversation after them changes from call to call.
+# ChatDatabricks does not forward per-message cache markers, so none are set.
+
+# Specialist text only feeds the FinalAnswerAgent, which writes what the farmer sees
+SPECIALIST_RULES = "Answer only for Indian farmers, in simple language, with specific numbers where available."
+
+SOIL_SYS = """You are the SoilCropAdvisor of AgriSarthi, an agricultural assistant for Indian farmers.
+You advise on soil health, crop selection, weather and disaster risk.
+Use soil_data_retriever and crop_recommendation_tool for soil and crop questions,
+weather_alert_tool for the forecast and disaster_alert_tool for NDMA alerts."""
+
+MARKET_SYS = """You are the MarketAnalyst of AgriSarthi, an agricultural assistant for Indian farmers.
+You report current mandi prices for crops. Always call market_price_tool with the crop
+and the city, district or state the farmer asked about."""
+
+FIN_SYS = """You are the FinancialAdvisor of AgriSarthi, an agricultural assistant for Indian farmers.
+You explain Indian government schemes (PM-KISAN, PM-KUSUM, PMFBY, KCC), subsidies and loans.
+Use scheme_search_tool to look up eligibility, subsidy and application details."""
+
+
+# ─── Specialist Response Cache ──────────────────────────────────────
+# Recurring questions ("potato price in Lucknow", "PM-KISAN eligibility") are served
+# from cache. Prices go stale fastest, scheme details hardly change.
+RESPONSE_TTL = {"MarketAnalyst": 300, "SoilCropAdvisor": 3600, "FinancialAdvisor": 86400}
+
+
+class ResponseCache:
+    """TTL cache for specialist answers: Redis when REDIS_URL is set, otherwise in-process."""
+    
+    def __init__(self, redis_url: str = "", maxsize: int = 1024):
+        self._redis = None
+        self._local = {}
+        self._maxsize = maxsize
+        if redis_url:
+            try:
+                import redis
+                # Sync client run in a worker thread: each run_agent call may use a fresh event loop
+                self._redis = redis.Redis.from_url(redis_url, decode_responses=True)
+            except ImportError:
+                print("⚠️ redis not installed — using in-process response cache")
+    
+    async def get(self, key: str):
+        if self._redis:
+            try:
+                return await asyncio.to_thread(self._redis.get, key)
+            except Exception as e:
+                print(f"⚠️ Response cache read failed: {e}")
+                return None
+        hit = self._local.get(key)
+        if hit and hit[1] > time.monotonic():
+            return hit[0]
+        self._local.pop(key, None)
+        return None
+    
+    async def set(self, key: str, value: str, ttl: int):
+        if self._redis:
+            try:
+                await asyncio.to_thread(self._redis.setex, key, ttl, value)
+            except Exception as e:
+                print(f"⚠️ Response cache write failed: {e}")
+            return
+        if len(self._local) >= self._maxsize:
+            self._local.pop(next(iter(self._local)))
+        self._local[key] = (value, time.monotonic() + ttl)
+
+
+response_cache = ResponseCache(os.getenv("REDIS_URL", ""))
+
+
+def response_cache_key(agent_name: str, query: str) -> str:
+    """Content-addressed key for an agent's answer to a normalized user query."""
+    digest = hashlib.blake2b(f"{agent_name}|{query}".encode(), digest_size=16).hexdigest()
+    return f"agrisarthi:resp:{digest}"
+
+
+# Earlier conversation sent with each LLM call; the current turn is always sent in full.
+# The budget is a rough token estimate (~4 characters per token).
+HISTORY_WINDOW = 6
+HISTORY_TOKEN_BUDGET = 1500
+
+
+def window_messages(messages: list, k: int = HISTORY_WINDOW, budget: int = HISTORY_TOKEN_BUDGET) -> list:
+    """The current turn plus the newest earlier messages, at most `k` of them and
+    about `budget` tokens. Earlier tool calls and raw tool output are left out:
+    the answer given in that turn already summarizes them."""
+    turn_start = next((i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), 0)
+    history = []
+    for m in reversed(messages[:turn_start]):
+        if isinstance(m, ToolMessage) or (isinstance(m, AIMessage) and m.tool_calls):
+            continue
+        budget -= len(str(m.content)) // 4
+        if len(history) >= k or budget < 0:
+            break
+        history.append(m)
+    return history[::-1] + messages[turn_start:]
+
+
+def prompt_token_usage(response) -> tuple:
+    """(prompt tokens, of which read from the endpoint's prompt cache), when reported.
+    A low cached share means the prefix before the conversation is not stable."""
+    usage = response.usage_metadata or {}
+    return usage.get("input_tokens"), (usage.get("input_token_details") or {}).get("cache_read")
+
+
+def create_specialist_agent_node(agent_name: str, system_prompt: str):
+    """Create a specialist node that answers with its own system prompt and tool subset."""
+    # Built once per specialist; every call reuses the same immutable prefix message.
+    enhanced_prompt = f"{system_prompt}\n\n{SPECIALIST_RULES}"
+    _prefix_msg = SystemMessage(content=enhanced_prompt)
+    _llm = llm.bind_tools(AGENT_TOOLS[agent_name])
+    ttl = RESPONSE_TTL.get(agent_name, 300)
+    
+    async def agent_node(state: AgentState, config: RunnableConfig):
+        key = None if has_earlier_turns(state['messages']) else response_cache_key(agent_name, state['original_query'])
+        if key and (cached := await response_cache.get(key)):
+            print(f"⚡ {agent_name} answered from cache")
+            return {"messages": [AIMessage(content=cached)]}
+        
+        print(f"🔄 {agent_name} processing with tools...")
+        response = await _llm.ainvoke([_prefix_msg, *window_messages(state['messages'])], config)
+        prompt_tokens, cached_tokens = prompt_token_usage(response)
+        if prompt_tokens:
+            print(f"   {agent_name} prompt: {prompt_tokens} tokens ({cached_tokens or 0} cached)")
+        # Tool-calling turns depend on live data; only direct answers are reusable
+        if response.tool_calls:
+            return {"messages": [response], "pending_calls": response.tool_calls}
+        if key and response.content:
+            await response_cache.set(key, response.content, ttl)
+        return {"messages": [response]}
+    return agent_node
+
+
+def aggregator(state: AgentState):
+    """Fan-in point for parallel specialists.
+    Their replies are already concatenated into state['messages'] by add_messages."""
+    return {}
+
+
+# ─── Tool Execution ─────────────────────────────────────────────────
+
+async def run_tool_call(call: dict) -> ToolMessage:
+    tool = TOOLS_BY_NAME.get(call["name"])
+    if tool is None:
+        return ToolMessage(content=f"Error: unknown tool {call['name']}", tool_call_id=call["id"], name=call["name"])
+    return await tool.ainvoke(call)
+
+
+async def tool_executor(state: AgentState):
+    """Runs the tool calls of all specialists concurrently."""
+    calls = state.get("pending_calls") or []
+    print(f"🔧 Running {len(calls)} tool call(s)...")
+    results = await asyncio.gather(*(run_tool_call(call) for call in calls))
+    return {"messages": list(results), "pending_calls": []}
+
+
+# ─── Final Answer Agent ─────────────────────────────────────────────
+
+def format_conversation(messages: list) -> str:
+    """Plain "role: content" lines. Unlike str(messages) this leaves out per-run
+    message ids, so repeated turns produce the same prompt (and LLM cache hits)."""
+    return "\n".join(f"{m.type}: {m.content}" for m in messages if m.content)
+
+
+FINAL_ANSWER_SYS = SystemMessage(content="""You are AgriSarthi, a friendly agricultural assistant for Indian farmers.
 Provide a clear, helpful response based on the conversation.
 
 Rules:
@@ -319,27 +780,46 @@ Rules:
 - Include relevant numbers, dates, prices where available
 - Do NOT mention agent names, tools, or internal processes
 - If the query is in Hindi/regional language, respond accordingly
-- Always be encouraging and supportive
+- Always be encouraging and supportive""")
+
 
-Conversation: {state['messages']}
+async def final_answer_agent(state: AgentState):
+    """Synthesizes the final farmer-friendly response."""
+    print("✍️ Synthesizing final answer...")
+    
+    synthesis_prompt = [
+        FINAL_ANSWER_SYS,
+        HumanMessage(content=f"""Conversation:
+{format_conversation(window_messages(state['messages']))}
 
-Provide the final, complete answer:"""
+Provide the final, complete answer:"""),
+    ]
     
-    response = llm.invoke(synthesis_prompt)
+    response = await llm.ainvoke(synthesis_prompt)
+    if response.content:
+        response.content = _ROLE_RE.sub("", response.content).lstrip()
+    if response.content and not has_earlier_turns(state['messages']):
+        # Cache for paraphrases as long as the freshest-moving data behind it stays valid
+        route = tuple(state.get("next_agents") or ())
+        ttl = min((RESPONSE_TTL.get(name, 3600) for name in route), default=3600)
+        await semantic_cache.add(state['original_query'], route, response.content, ttl)
     return {"messages": [response]}
 
 
 # ─── Router Functions ───────────────────────────────────────────────
 
 def tool_router(state: AgentState):
-    """Route to tools if called, otherwise to FinalAnswer."""
-    last = state["messages"][-1]
-    if hasattr(last, 'tool_calls') and last.tool_calls:
+    """Route to tools if any specialist called one, otherwise to FinalAnswer."""
+    if state.get("pending_calls"):
         return "tools"
     return "FinalAnswerAgent"
 
 def supervisor_router(state: AgentState):
-    return state.get("next_agent", "FinalAnswerAgent")
+    """Send to one specialist, or fan out to several in parallel."""
+    next_agents = state.get("next_agents") or ["FinalAnswerAgent"]
+    if len(next_agents) > 1:
+        return [Send(name, state) for name in next_agents]
+    return next_agents[0]
 
 # COMMAND ----------
 
@@ -349,11 +829,12 @@ workflow = StateGraph(AgentState)
 
 # Add nodes
 workflow.add_node("Supervisor", supervisor_agent)
-workflow.add_node("SoilCropAdvisor", specialist_agent_node)
-workflow.add_node("MarketAnalyst", specialist_agent_node)
-workflow.add_node("FinancialAdvisor", specialist_agent_node)
+workflow.add_node("SoilCropAdvisor", create_specialist_agent_node("SoilCropAdvisor", SOIL_SYS))
+workflow.add_node("MarketAnalyst", create_specialist_agent_node("MarketAnalyst", MARKET_SYS))
+workflow.add_node("FinancialAdvisor", create_specialist_agent_node("FinancialAdvisor", FIN_SYS))
+workflow.add_node("Aggregator", aggregator)
 workflow.add_node("FinalAnswerAgent", final_answer_agent)
-workflow.add_node("tools", tool_node)
+workflow.add_node("tools", tool_executor)
 
 # Set entry point
 workflow.set_entry_point("Supervisor")
@@ -363,16 +844,15 @@ workflow.add_conditional_edges("Supervisor", supervisor_router, {
     "SoilCropAdvisor": "SoilCropAdvisor",
     "MarketAnalyst": "MarketAnalyst",
     "FinancialAdvisor": "FinancialAdvisor",
-    "FinalAnswerAgent": "FinalAnswerAgent"
+    "FinalAnswerAgent": "FinalAnswerAgent",
+    "end": END
 })
 
-workflow.add_conditional_edges("SoilCropAdvisor", tool_router, {
-    "tools": "tools", "FinalAnswerAgent": "FinalAnswerAgent"
-})
-workflow.add_conditional_edges("MarketAnalyst", tool_router, {
-    "tools": "tools", "FinalAnswerAgent": "FinalAnswerAgent"
-})
-workflow.add_conditional_edges("FinancialAdvisor", tool_router, {
+# Parallel specialists join at the Aggregator before tools run
+workflow.add_edge("SoilCropAdvisor", "Aggregator")
+workflow.add_edge("MarketAnalyst", "Aggregator")
+workflow.add_edge("FinancialAdvisor", "Aggregator")
+workflow.add_conditional_edges("Aggregator", tool_router, {
     "tools": "tools", "FinalAnswerAgent": "FinalAnswerAgent"
 })
 
@@ -381,8 +861,148 @@ workflow.add_edge("FinalAnswerAgent", END)
 
 # Compile
 agrisarthi_agent = workflow.compile()
+
+# Requests carrying custom_inputs.session_id resume that conversation from a
+# checkpoint, so channels only send the new message. Compiled once; the least
+# recently used sessions are dropped past MAX_SESSIONS.
+class LatestCheckpointSaver(MemorySaver):
+    """MemorySaver that keeps only each thread's newest checkpoint. Sessions resume from
+    their latest state and never replay history, so older checkpoints, their pending
+    writes and channel values no longer referenced are dropped on every save. This edits
+    MemorySaver's private storage, writes and blobs, so the pinned langgraph versions in
+    pip_requirements bound the layout it expects."""
+    
+    def __init__(self):
+        super().__init__()
+        self._blob_keys = {}   # (thread_id, checkpoint_ns) -> blob keys written for it
+        self._prune_lock = threading.Lock()
+    
+    def put(self, config, checkpoint, metadata, new_versions):
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = saved["configurable"]["thread_id"]
+        checkpoint_ns = saved["configurable"]["checkpoint_ns"]
+        keep = {(thread_id, checkpoint_ns, k, v) for k, v in checkpoint["channel_versions"].items()}
+        with self._prune_lock:
+            checkpoints = self.storage[thread_id][checkpoint_ns]
+            for checkpoint_id in [c for c in checkpoints if c != checkpoint["id"]]:
+                del checkpoints[checkpoint_id]
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            blob_keys = self._blob_keys.setdefault((thread_id, checkpoint_ns), set())
+            blob_keys.update((thread_id, checkpoint_ns, k, v) for k, v in new_versions.items())
+            for key in blob_keys - keep:
+                self.blobs.pop(key, None)
+            blob_keys &= keep
+        return saved
+    
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self._prune_lock:
+            for key in [k for k in self._blob_keys if k[0] == thread_id]:
+                del self._blob_keys[key]
+
+
+checkpointer = LatestCheckpointSaver()
+agrisarthi_session_agent = workflow.compile(checkpointer=checkpointer)
+MAX_SESSIONS = 1000
+_sessions: OrderedDict = OrderedDict()
+_sessions_lock = threading.Lock()
 print("🎉 AgriSarthi agent compiled successfully!")
 
+
+def graph_for(inputs: dict):
+    """The compiled graph and run config for a request."""
+    session_id = (inputs.get("custom_inputs") or {}).get("session_id")
+    if not session_id:
+        return agrisarthi_agent, None
+    with _sessions_lock:
+        _sessions[session_id] = None
+        _sessions.move_to_end(session_id)
+        evicted = _sessions.popitem(last=False)[0] if len(_sessions) > MAX_SESSIONS else None
+    if evicted:
+        checkpointer.delete_thread(evicted)
+    return agrisarthi_session_agent, {"configurable": {"thread_id": session_id}}
+
+
+def run_agent(inputs: dict) -> dict:
+    """Run the async graph from synchronous callers (notebook cells, MLflow predict)."""
+    graph, config = graph_for(inputs)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(graph.ainvoke(inputs, config))
+    # The notebook kernel already runs an event loop, so run the graph on a worker thread
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, graph.ainvoke(inputs, config)).result()
+
+
+def is_answer_message(message, node: str) -> bool:
+    """Whether a streamed message is farmer-facing answer text."""
+    if not isinstance(message, AIMessage) or not message.content or message.tool_calls:
+        return False
+    if node == "FinalAnswerAgent":
+        return True
+    # The Supervisor's direct replies (greetings, cache hits), not its routing LLM tokens
+    return node == "Supervisor" and not isinstance(message, AIMessageChunk)
+
+
+# Enough leading text to recognise a leading role label before anything is sent
+_PREFIX_PROBE = len("**FinalAnswerAgent:**") + 1
+
+
+def clean_answer_stream(pieces):
+    """Strip role labels and agent names from streamed answer text, as _ROLE_RE does on the
+    whole answer. The model emits a name like "MarketAnalyst" as several tokens, so text
+    after the last space or newline is held back until the next one arrives."""
+    head, pending, sent = "", "", False
+    for piece in pieces:
+        if head is not None:
+            head += piece
+            if len(head) < _PREFIX_PROBE:
+                continue
+            piece, head = _LEAD_ROLE_RE.sub("", head), None
+        pending += piece
+        cut = max(pending.rfind(" "), pending.rfind("\n")) + 1
+        text, pending = _INLINE_ROLE_RE.sub("", pending[:cut]), pending[cut:]
+        if not sent:
+            text = text.lstrip()
+        if text:
+            sent = True
+            yield text
+    text = _ROLE_RE.sub("", head) if head is not None else _INLINE_ROLE_RE.sub("", pending)
+    if text := text if sent else text.lstrip():
+        yield text
+
+
+def stream_agent(inputs: dict):
+    """Yield the final answer word by word as the LLM produces it.
+    
+    The text is cleaned by clean_answer_stream, so it matches what final_answer_agent
+    stores and run_agent returns. The one gap: a leading role label that only starts
+    after the first _PREFIX_PROBE characters keeps its markup in the stream."""
+    graph, config = graph_for(inputs)
+    chunks = queue.Queue()
+    
+    async def produce():
+        try:
+            async for message, metadata in graph.astream(inputs, config, stream_mode="messages"):
+                if is_answer_message(message, metadata.get("langgraph_node")):
+                    chunks.put(message.content)
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(None)
+    
+    # Own thread and event loop, so this works from the notebook kernel and from serving
+    threading.Thread(target=asyncio.run, args=(produce(),), daemon=True).start()
+    
+    def pieces():
+        while (piece := chunks.get()) is not None:
+            if isinstance(piece, Exception):
+                raise piece
+            yield piece
+    
+    yield from clean_answer_stream(pieces())
+
 # COMMAND ----------
 
 # ─── Log Agent to MLflow (Models-from-Code) ─────────────────────────
@@ -394,20 +1014,46 @@ import os
 print("📦 Creating agent code file for models-from-code registration...")
 
 AGENT_CODE = r'''import os
+import re
 import json
+import time
+import logging
+import queue
+import asyncio
+import hashlib
+import threading
 import mlflow
+import numpy as np
 import requests as http_requests
-from typing import Annotated, Literal
-from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
+from requests.adapters import HTTPAdapter
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Annotated
+from langchain_core.messages import BaseMessage, AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.caches import InMemoryCache
+from langchain_core.globals import set_llm_cache
 from langchain_community.chat_models import ChatDatabricks
 from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolNode
 from langgraph.graph.message import add_messages
+from langgraph.types import Send
+from langgraph.checkpoint.memory import MemorySaver
 from typing_extensions import TypedDict
 from langchain.tools import tool as langchain_tool
 from pydantic import BaseModel, Field
 
+log = logging.getLogger("agrisarthi.agent")
+
 llm = ChatDatabricks(endpoint="databricks-meta-llama-3-3-70b-instruct", temperature=0)
+llm_router = ChatDatabricks(endpoint="databricks-meta-llama-3-1-8b-instruct", temperature=0, max_tokens=8)
+ROUTER_STOP = ["\n", " "]
+set_llm_cache(InMemoryCache(maxsize=4096))
+
+# Pooled keep-alive connections shared by every tool call (SQL API, weather, NDMA)
+http_session = http_requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=32))
+http_session.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=32))
 
 # ─── SQL Statement API helper (works in Model Serving, no PySpark needed) ───
 def run_sql(query: str) -> list:
@@ -417,7 +1063,7 @@ def run_sql(query: str) -> list:
     warehouse_id = os.environ.get("DATABRICKS_SQL_WAREHOUSE_ID", "")
     if not host or not token or not warehouse_id:
         raise ValueError("Missing DATABRICKS_HOST, DATABRICKS_TOKEN, or DATABRICKS_SQL_WAREHOUSE_ID env vars")
-    resp = http_requests.post(
+    resp = http_session.post(
         f"{host}/api/2.0/sql/statements",
         headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
         json={"warehouse_id": warehouse_id, "statement": query, "wait_timeout": "30s", "disposition": "INLINE"},
@@ -456,16 +1102,22 @@ class CropRecToolInput(BaseModel):
     district: str = Field(description="District")
     season: str = Field(default="kharif", description="Season")
 
+@lru_cache(maxsize=1)
+def soil_index():
+    from databricks.vector_search.client import VectorSearchClient
+    return VectorSearchClient().get_index(endpoint_name="agrisarthi-vs-endpoint", index_name="agrisarthi.main.soil_vector_index")
+
+@lru_cache(maxsize=1024)
+def search_soil(query: str) -> tuple:
+    results = soil_index().similarity_search(query_text=query, columns=["state","district","soil_type","ph","soil_text"], num_results=3)
+    return tuple(r[-1] for r in results.get("result", {}).get("data_array", []))
+
 @langchain_tool("soil_data_retriever", args_schema=SoilToolInput)
 def soil_data_retriever_tool(query: str) -> str:
     """Search soil database via Vector Search."""
-    from databricks.vector_search.client import VectorSearchClient
     try:
-        vsc = VectorSearchClient()
-        index = vsc.get_index(endpoint_name="agrisarthi-vs-endpoint", index_name="agrisarthi.main.soil_vector_index")
-        results = index.similarity_search(query_text=query, columns=["state","district","soil_type","ph","soil_text"], num_results=3)
-        rows = results.get("result", {}).get("data_array", [])
-        return "\n\n".join([r[-1] for r in rows]) if rows else "No soil data found."
+        rows = search_soil(" ".join(query.lower().split()))
+        return "\n\n".join(rows) if rows else "No soil data found."
     except Exception as e:
         return "Error: " + str(e)
 
@@ -502,7 +1154,7 @@ def weather_tool(location: str) -> str:
     if not key:
         return "Weather unavailable - API key not configured."
     try:
-        r = http_requests.get("http://api.openweathermap.org/data/2.5/weather", params={"q": location, "appid": key, "units": "metric"}, timeout=5)
+        r = http_session.get("http://api.openweathermap.org/data/2.5/weather", params={"q": location, "appid": key, "units": "metric"}, timeout=5)
         r.raise_for_status()
         d = r.json()
         return f"{d['name']}: {d['weather'][0]['description']}, {d['main']['temp']}C (feels like {d['main']['feels_like']}C), Humidity {d['main']['humidity']}%, Wind {d['wind']['speed']} m/s"
@@ -513,7 +1165,7 @@ def weather_tool(location: str) -> str:
 def disaster_tool(location: str) -> str:
     """Check NDMA disaster alerts."""
     try:
-        r = http_requests.post("https://sachet.ndma.gov.in/cap_public_website/FetchAddressWiseAlerts", data={"address": location, "radius": 50}, headers={"Accept": "application/json", "Content-Type": "application/x-www-form-urlencoded"}, timeout=15)
+        r = http_session.post("https://sachet.ndma.gov.in/cap_public_website/FetchAddressWiseAlerts", data={"address": location, "radius": 50}, headers={"Accept": "application/json", "Content-Type": "application/x-www-form-urlencoded"}, timeout=15)
         r.raise_for_status()
         alerts = r.json()
         if isinstance(alerts, list) and alerts:
@@ -573,53 +1225,472 @@ def crop_rec_tool(state: str, district: str, season: str = "kharif") -> str:
 
 all_tools = [soil_data_retriever_tool, market_price_tool, weather_tool, disaster_tool, scheme_tool, crop_rec_tool]
 
-class AgentState(TypedDict):
-    messages: Annotated[list[BaseMessage], add_messages]
-    next_agent: Literal["Supervisor", "SoilCropAdvisor", "MarketAnalyst", "FinancialAdvisor", "FinalAnswerAgent", "end"]
-
-llm_with_tools = llm.bind_tools(all_tools)
-tool_node = ToolNode(all_tools)
-
-def supervisor_agent(state: AgentState):
-    user_input = state["messages"][-1].content
-    prompt = "You are AgriSarthi supervisor. Route to: SoilCropAdvisor (soil/crops/weather/disaster), MarketAnalyst (prices/mandi), FinancialAdvisor (schemes/loans), FinalAnswerAgent (general). Query: " + user_input + ". Reply ONLY agent name."
-    response = llm.invoke(prompt)
-    name = response.content.strip()
+MAX_STATE_MESSAGES = 32
+
+def bounded_add_messages(left: list, right: list) -> list:
+    merged = add_messages(left, right)
+    start = max(0, len(merged) - MAX_STATE_MESSAGES)
+    while start < len(merged) and isinstance(merged[start], ToolMessage):
+        start += 1
+    return merged[start:]
+
+def merge_tool_calls(left: list, right: list) -> list:
+    return (left or []) + right if right else []
+
+class AgentState(TypedDict, total=False):
+    messages: Annotated[list[BaseMessage], bounded_add_messages]
+    pending_calls: Annotated[list[dict], merge_tool_calls]
+    next_agents: list[str]
+    original_query: str
+
+AGENT_TOOLS = {
+    "SoilCropAdvisor": [soil_data_retriever_tool, weather_tool, disaster_tool, crop_rec_tool],
+    "MarketAnalyst": [market_price_tool],
+    "FinancialAdvisor": [scheme_tool],
+}
+TOOLS_BY_NAME = {t.name: t for t in all_tools}
+
+
+# Keyword routing first; multi-domain queries fan out, the LLM is only asked when nothing matches
+SUPERVISOR_KEYWORDS = {
+    "MarketAnalyst": ["price", "prices", "mandi", "rate", "rates", "market", "bhav", "sell", "selling"],
+    "SoilCropAdvisor": ["soil", "crop", "crops", "fertilizer", "fertiliser", "weather", "rain", "rainfall", "forecast", "disaster", "flood", "cyclone", "drought", "pest", "sow", "sowing", "irrigation", "seed", "seeds", "harvest"],
+    "FinancialAdvisor": ["loan", "loans", "scheme", "schemes", "subsidy", "subsidies", "pm-kisan", "pm-kusum", "pmfby", "kcc", "insurance", "credit", "yojana"],
+}
+KEYWORD_AGENT = {word: name for name, words in SUPERVISOR_KEYWORDS.items() for word in frozenset(words)}
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+GREETING_PATTERN = re.compile(r"^(hi|hello|namaste|hey)\b", re.I)
+PURE_GREETINGS = frozenset({"hi", "hello", "hey", "namaste", "hola"})
+GREETING_REPLY = "Namaste! Ask me about crops, mandi prices, or farmer schemes."
+_AGENT_NAMES = "MarketAnalyst|SoilCropAdvisor|FinancialAdvisor|FinalAnswerAgent"
+_LEAD_ROLE = rf"^\W*(?i:{_AGENT_NAMES}|Supervisor)\b[\s:*\-]*"
+_INLINE_ROLE = rf"\b(?:{_AGENT_NAMES})\b:?[ \t]?"
+_ROLE_RE = re.compile(rf"{_LEAD_ROLE}|{_INLINE_ROLE}")
+_LEAD_ROLE_RE = re.compile(_LEAD_ROLE)
+_INLINE_ROLE_RE = re.compile(_INLINE_ROLE)
+
+def strip_role_prefix(response):
+    if response.content:
+        response.content = _ROLE_RE.sub("", response.content).lstrip()
+    return response
+
+_llm_routes: dict = {}
+_llm_routes_lock = threading.Lock()
+ROUTER_SYS = SystemMessage(content="You are AgriSarthi supervisor. Route to: SoilCropAdvisor (soil/crops/weather/disaster), MarketAnalyst (prices/mandi), FinancialAdvisor (schemes/loans), FinalAnswerAgent (general). Reply ONLY agent name.")
+
+async def route_with_llm(user_input: str) -> str:
+    with _llm_routes_lock:
+        known = _llm_routes.get(user_input)
+    if known:
+        return known
+    if learned := await llm_route_cache.lookup(user_input, ()):
+        return learned
+    prompt = [ROUTER_SYS, HumanMessage(content="Query: " + user_input)]
+    try:
+        response = await llm_router.ainvoke(prompt, stop=ROUTER_STOP)
+    except Exception:
+        log.warning("router model failed, falling back to main LLM", exc_info=True)
+        response = await llm.ainvoke(prompt, stop=ROUTER_STOP)
+    words = response.content.split()
+    name = words[0].strip("*.:\"'") if words else ""
     if name not in ["SoilCropAdvisor", "MarketAnalyst", "FinancialAdvisor", "FinalAnswerAgent"]:
         name = "FinalAnswerAgent"
-    return {"next_agent": name}
-
-def specialist_agent_node(state: AgentState):
-    return {"messages": [llm_with_tools.invoke(state["messages"])]}
-
-def final_answer_agent(state: AgentState):
-    prompt = "You are AgriSarthi, farming assistant. Give clear, helpful answer. Conversation: " + str(state["messages"]) + ". Answer:"
-    return {"messages": [llm.invoke(prompt)]}
+    with _llm_routes_lock:
+        if len(_llm_routes) >= 1024:
+            _llm_routes.pop(next(iter(_llm_routes)), None)
+        _llm_routes[user_input] = name
+    await llm_route_cache.add(user_input, (), name, ttl=86400)
+    return name
+
+@lru_cache(maxsize=1024)
+def _route(user_text: str) -> tuple:
+    scores = {}
+    for token in _TOKEN_RE.findall(user_text):
+        for word in (token, *token.split("-")) if "-" in token else (token,):
+            if name := KEYWORD_AGENT.get(word):
+                scores[name] = scores.get(name, 0) + 1
+    matched = tuple(sorted(scores, key=scores.get, reverse=True))
+    if matched:
+        return matched
+    if GREETING_PATTERN.match(user_text):
+        return ("FinalAnswerAgent",)
+    return ()
+
+def load_embedding_model(model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+    try:
+        from fastembed import TextEmbedding
+        return TextEmbedding(model_name)
+    except ImportError:
+        log.warning("fastembed not installed, local embeddings disabled")
+    except Exception:
+        log.warning("local embeddings disabled", exc_info=True)
+    return None
+
+embedding_model = load_embedding_model()
+
+@lru_cache(maxsize=1024)
+def embed(text: str) -> np.ndarray:
+    vector = np.asarray(next(iter(embedding_model.embed([text]))), dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+def embed_many(texts: list[str]) -> np.ndarray:
+    vectors = np.asarray(list(embedding_model.embed(texts)), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+ROUTE_EXAMPLES = {
+    "SoilCropAdvisor": ["which crop should i grow this season", "what is the soil type in my district",
+                        "how much fertilizer should i use", "will it rain this week", "is there a flood warning",
+                        "kaunsi fasal ugaun", "mitti ki jaanch kaise karein", "barish kab hogi"],
+    "MarketAnalyst": ["what is the mandi price today", "onion rate in the market", "where can i sell my wheat",
+                      "aaj gehun ka bhav kya hai", "tamatar ka rate kya chal raha hai"],
+    "FinancialAdvisor": ["which government scheme can help me", "how do i get a farm loan",
+                         "subsidy for solar pump", "how to claim crop insurance", "sarkari yojana ki jaankari",
+                         "kisan credit card kaise banega"],
+}
+ROUTE_MIN_SIMILARITY = 0.5
+_route_labels = [name for name, examples in ROUTE_EXAMPLES.items() for _ in examples]
+_route_vectors = embed_many([q for examples in ROUTE_EXAMPLES.values() for q in examples]) if embedding_model is not None else None
+
+async def route_with_embeddings(user_text: str):
+    if _route_vectors is None:
+        return None
+    scores = _route_vectors @ await asyncio.to_thread(embed, user_text)
+    best = int(scores.argmax())
+    return _route_labels[best] if scores[best] >= ROUTE_MIN_SIMILARITY else None
+
+# Embeddings rate "onion price in Delhi" ~ "onion price in Pune": answer hits also need the same entities
+_QUERY_FILLER = frozenset("""
+    a an the of in at for to on from and or is are be what whats which how when where
+    me my i we our you your please tell give show about do does can will should much
+    today now current latest price prices rate rates cost mandi market bhav
+    ka ki ke ko kya hai hain aaj mein batao bataiye kitna
+""".split())
+
+def query_entities(text: str) -> frozenset:
+    return frozenset(_TOKEN_RE.findall(text.lower())) - _QUERY_FILLER
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.92, maxsize: int = 10_000, match_entities: bool = True):
+        self.threshold, self.maxsize, self.match_entities = threshold, maxsize, match_entities
+        self._vectors, self._entries = None, [None] * maxsize
+        self._count = self._next = 0
+        self._lock = threading.Lock()
+
+    async def lookup(self, text: str, route: tuple):
+        if embedding_model is None or not self._count:
+            return None
+        vector = await asyncio.to_thread(embed, text)
+        entities = query_entities(text) if self.match_entities else None
+        now = time.monotonic()
+        with self._lock:
+            scores = self._vectors[:self._count] @ vector
+            candidates = np.flatnonzero(scores >= self.threshold)
+            for row in candidates[np.argsort(-scores[candidates])]:
+                cached_route, cached_entities, answer, expires_at = self._entries[row]
+                if cached_route == route and cached_entities == entities and expires_at > now:
+                    return answer
+        return None
+
+    async def add(self, text: str, route: tuple, answer: str, ttl: int):
+        if embedding_model is None:
+            return
+        vector = await asyncio.to_thread(embed, text)
+        entities = query_entities(text) if self.match_entities else None
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+            self._vectors[self._next] = vector
+            self._entries[self._next] = (route, entities, answer, time.monotonic() + ttl)
+            self._next = (self._next + 1) % self.maxsize
+            self._count = min(self._count + 1, self.maxsize)
+
+semantic_cache = SemanticCache()
+llm_route_cache = SemanticCache(maxsize=4096, match_entities=False)
+
+def has_earlier_turns(messages: list) -> bool:
+    return sum(isinstance(m, HumanMessage) for m in messages) > 1
+
+async def supervisor_agent(state: AgentState):
+    user_text = state["messages"][-1].content.strip().lower()
+    if user_text.rstrip("!.") in PURE_GREETINGS:
+        return {"messages": [AIMessage(content=GREETING_REPLY)], "next_agents": ["end"], "original_query": user_text}
+    names = _route(user_text) or (await route_with_embeddings(user_text) or await route_with_llm(user_text),)
+    if not has_earlier_turns(state["messages"]) and (cached := await semantic_cache.lookup(user_text, names)):
+        return {"messages": [AIMessage(content=cached)], "next_agents": ["end"], "original_query": user_text}
+    return {"next_agents": list(names), "original_query": user_text, "pending_calls": []}
+
+SPECIALIST_RULES = "Answer only for Indian farmers, in simple language, with specific numbers where available."
+SOIL_SYS = "You are the SoilCropAdvisor of AgriSarthi for Indian farmers: soil health, crop selection, weather and disaster risk. Use soil_data_retriever and crop_recommendation_tool for soil/crops, weather_alert_tool for the forecast, disaster_alert_tool for NDMA alerts."
+MARKET_SYS = "You are the MarketAnalyst of AgriSarthi for Indian farmers: current mandi prices. Always call market_price_tool with the crop and the city, district or state asked about."
+FIN_SYS = "You are the FinancialAdvisor of AgriSarthi for Indian farmers: government schemes (PM-KISAN, PM-KUSUM, PMFBY, KCC), subsidies and loans. Use scheme_search_tool for eligibility, subsidy and application details."
+
+RESPONSE_TTL = {"MarketAnalyst": 300, "SoilCropAdvisor": 3600, "FinancialAdvisor": 86400}
+
+class ResponseCache:
+    def __init__(self, redis_url: str = "", maxsize: int = 1024):
+        self._redis, self._local, self._maxsize = None, {}, maxsize
+        if redis_url:
+            try:
+                import redis
+                self._redis = redis.Redis.from_url(redis_url, decode_responses=True)
+            except ImportError:
+                log.warning("redis not installed, using in-process response cache")
+
+    async def get(self, key: str):
+        if self._redis:
+            try:
+                return await asyncio.to_thread(self._redis.get, key)
+            except Exception:
+                log.warning("response cache read failed", exc_info=True)
+                return None
+        hit = self._local.get(key)
+        if hit and hit[1] > time.monotonic():
+            return hit[0]
+        self._local.pop(key, None)
+        return None
+
+    async def set(self, key: str, value: str, ttl: int):
+        if self._redis:
+            try:
+                await asyncio.to_thread(self._redis.setex, key, ttl, value)
+            except Exception:
+                log.warning("response cache write failed", exc_info=True)
+            return
+        if len(self._local) >= self._maxsize:
+            self._local.pop(next(iter(self._local)))
+        self._local[key] = (value, time.monotonic() + ttl)
+
+response_cache = ResponseCache(os.environ.get("REDIS_URL", ""))
+
+def response_cache_key(agent_name: str, query: str) -> str:
+    return "agrisarthi:resp:" + hashlib.blake2b(f"{agent_name}|{query}".encode(), digest_size=16).hexdigest()
+
+HISTORY_WINDOW = 6
+HISTORY_TOKEN_BUDGET = 1500
+
+def window_messages(messages: list, k: int = HISTORY_WINDOW, budget: int = HISTORY_TOKEN_BUDGET) -> list:
+    turn_start = next((i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), 0)
+    history = []
+    for m in reversed(messages[:turn_start]):
+        if isinstance(m, ToolMessage) or (isinstance(m, AIMessage) and m.tool_calls):
+            continue
+        budget -= len(str(m.content)) // 4
+        if len(history) >= k or budget < 0:
+            break
+        history.append(m)
+    return history[::-1] + messages[turn_start:]
+
+def log_prompt_usage(node: str, response):
+    if log.isEnabledFor(logging.DEBUG) and (usage := response.usage_metadata):
+        log.debug("%s prompt tokens: %s (cached: %s)", node, usage.get("input_tokens"), (usage.get("input_token_details") or {}).get("cache_read", 0))
+
+def create_specialist_agent_node(agent_name: str, system_prompt: str):
+    prefix = SystemMessage(content=system_prompt + "\n\n" + SPECIALIST_RULES)
+    bound_llm = llm.bind_tools(AGENT_TOOLS[agent_name])
+    ttl = RESPONSE_TTL.get(agent_name, 300)
+    async def agent_node(state: AgentState, config: RunnableConfig):
+        key = None if has_earlier_turns(state["messages"]) else response_cache_key(agent_name, state["original_query"])
+        if key and (cached := await response_cache.get(key)):
+            return {"messages": [AIMessage(content=cached)]}
+        response = await bound_llm.ainvoke([prefix, *window_messages(state["messages"])], config)
+        log_prompt_usage(agent_name, response)
+        if response.tool_calls:
+            return {"messages": [response], "pending_calls": response.tool_calls}
+        if key and response.content:
+            await response_cache.set(key, response.content, ttl)
+        return {"messages": [response]}
+    return agent_node
+
+def aggregator(state: AgentState):
+    return {}
+
+async def run_tool_call(call: dict) -> ToolMessage:
+    tool = TOOLS_BY_NAME.get(call["name"])
+    if tool is None:
+        log.warning("model requested unknown tool %s", call["name"])
+        return ToolMessage(content="Error: unknown tool " + call["name"], tool_call_id=call["id"], name=call["name"])
+    return await tool.ainvoke(call)
+
+async def tool_executor(state: AgentState):
+    results = await asyncio.gather(*(run_tool_call(call) for call in state.get("pending_calls") or []))
+    return {"messages": list(results), "pending_calls": []}
+
+def format_conversation(messages: list) -> str:
+    return "\n".join(f"{m.type}: {m.content}" for m in messages if m.content)
+
+FINAL_ANSWER_SYS = SystemMessage(content="You are AgriSarthi, farming assistant. Give clear, helpful answer. Do not mention agent names or tools.")
+
+async def final_answer_agent(state: AgentState):
+    prompt = [FINAL_ANSWER_SYS, HumanMessage(content="Conversation:\n" + format_conversation(window_messages(state["messages"])) + "\nAnswer:")]
+    response = strip_role_prefix(await llm.ainvoke(prompt))
+    log_prompt_usage("FinalAnswerAgent", response)
+    if response.content and not has_earlier_turns(state["messages"]):
+        route = tuple(state.get("next_agents") or ())
+        ttl = min((RESPONSE_TTL.get(name, 3600) for name in route), default=3600)
+        await semantic_cache.add(state["original_query"], route, response.content, ttl)
+    return {"messages": [response]}
 
 def tool_router(state: AgentState):
-    last = state["messages"][-1]
-    return "tools" if hasattr(last, "tool_calls") and last.tool_calls else "FinalAnswerAgent"
+    return "tools" if state.get("pending_calls") else "FinalAnswerAgent"
 
 def supervisor_router(state: AgentState):
-    return state.get("next_agent", "FinalAnswerAgent")
+    names = state.get("next_agents") or ["FinalAnswerAgent"]
+    return [Send(name, state) for name in names] if len(names) > 1 else names[0]
 
 workflow = StateGraph(AgentState)
 workflow.add_node("Supervisor", supervisor_agent)
-workflow.add_node("SoilCropAdvisor", specialist_agent_node)
-workflow.add_node("MarketAnalyst", specialist_agent_node)
-workflow.add_node("FinancialAdvisor", specialist_agent_node)
+workflow.add_node("SoilCropAdvisor", create_specialist_agent_node("SoilCropAdvisor", SOIL_SYS))
+workflow.add_node("MarketAnalyst", create_specialist_agent_node("MarketAnalyst", MARKET_SYS))
+workflow.add_node("FinancialAdvisor", create_specialist_agent_node("FinancialAdvisor", FIN_SYS))
+workflow.add_node("Aggregator", aggregator)
 workflow.add_node("FinalAnswerAgent", final_answer_agent)
-workflow.add_node("tools", tool_node)
+workflow.add_node("tools", tool_executor)
 workflow.set_entry_point("Supervisor")
-workflow.add_conditional_edges("Supervisor", supervisor_router, {"SoilCropAdvisor": "SoilCropAdvisor", "MarketAnalyst": "MarketAnalyst", "FinancialAdvisor": "FinancialAdvisor", "FinalAnswerAgent": "FinalAnswerAgent"})
-workflow.add_conditional_edges("SoilCropAdvisor", tool_router, {"tools": "tools", "FinalAnswerAgent": "FinalAnswerAgent"})
-workflow.add_conditional_edges("MarketAnalyst", tool_router, {"tools": "tools", "FinalAnswerAgent": "FinalAnswerAgent"})
-workflow.add_conditional_edges("FinancialAdvisor", tool_router, {"tools": "tools", "FinalAnswerAgent": "FinalAnswerAgent"})
+workflow.add_conditional_edges("Supervisor", supervisor_router, {"SoilCropAdvisor": "SoilCropAdvisor", "MarketAnalyst": "MarketAnalyst", "FinancialAdvisor": "FinancialAdvisor", "FinalAnswerAgent": "FinalAnswerAgent", "end": END})
+workflow.add_edge("SoilCropAdvisor", "Aggregator")
+workflow.add_edge("MarketAnalyst", "Aggregator")
+workflow.add_edge("FinancialAdvisor", "Aggregator")
+workflow.add_conditional_edges("Aggregator", tool_router, {"tools": "tools", "FinalAnswerAgent": "FinalAnswerAgent"})
 workflow.add_edge("tools", "FinalAnswerAgent")
 workflow.add_edge("FinalAnswerAgent", END)
 
 agrisarthi_agent = workflow.compile()
-mlflow.models.set_model(agrisarthi_agent)
+
+# custom_inputs.session_id resumes that conversation from its checkpoint; LRU-bounded,
+# and only the newest checkpoint per thread is kept
+class LatestCheckpointSaver(MemorySaver):
+    def __init__(self):
+        super().__init__()
+        self._blob_keys = {}
+        self._prune_lock = threading.Lock()
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = saved["configurable"]["thread_id"]
+        checkpoint_ns = saved["configurable"]["checkpoint_ns"]
+        keep = {(thread_id, checkpoint_ns, k, v) for k, v in checkpoint["channel_versions"].items()}
+        with self._prune_lock:
+            checkpoints = self.storage[thread_id][checkpoint_ns]
+            for checkpoint_id in [c for c in checkpoints if c != checkpoint["id"]]:
+                del checkpoints[checkpoint_id]
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            blob_keys = self._blob_keys.setdefault((thread_id, checkpoint_ns), set())
+            blob_keys.update((thread_id, checkpoint_ns, k, v) for k, v in new_versions.items())
+            for key in blob_keys - keep:
+                self.blobs.pop(key, None)
+            blob_keys &= keep
+        return saved
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self._prune_lock:
+            for key in [k for k in self._blob_keys if k[0] == thread_id]:
+                del self._blob_keys[key]
+
+checkpointer = LatestCheckpointSaver()
+agrisarthi_session_agent = workflow.compile(checkpointer=checkpointer)
+MAX_SESSIONS = 1000
+_sessions: OrderedDict = OrderedDict()
+_sessions_lock = threading.Lock()
+
+def graph_for(inputs: dict):
+    session_id = (inputs.get("custom_inputs") or {}).get("session_id")
+    if not session_id:
+        return agrisarthi_agent, None
+    with _sessions_lock:
+        _sessions[session_id] = None
+        _sessions.move_to_end(session_id)
+        evicted = _sessions.popitem(last=False)[0] if len(_sessions) > MAX_SESSIONS else None
+    if evicted:
+        checkpointer.delete_thread(evicted)
+    return agrisarthi_session_agent, {"configurable": {"thread_id": session_id}}
+
+# Nodes are async; Model Serving calls the model synchronously
+def run_agent(inputs: dict) -> dict:
+    graph, config = graph_for(inputs)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(graph.ainvoke(inputs, config))
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, graph.ainvoke(inputs, config)).result()
+
+def is_answer_message(message, node: str) -> bool:
+    if not isinstance(message, AIMessage) or not message.content or message.tool_calls:
+        return False
+    return node == "FinalAnswerAgent" or (node == "Supervisor" and not isinstance(message, AIMessageChunk))
+
+_PREFIX_PROBE = len("**FinalAnswerAgent:**") + 1
+
+# Same cleanup as final_answer_agent applies to the stored answer, for any chunking
+def clean_answer_stream(pieces):
+    head, pending, sent = "", "", False
+    for piece in pieces:
+        if head is not None:
+            head += piece
+            if len(head) < _PREFIX_PROBE:
+                continue
+            piece, head = _LEAD_ROLE_RE.sub("", head), None
+        pending += piece
+        cut = max(pending.rfind(" "), pending.rfind("\n")) + 1
+        text, pending = _INLINE_ROLE_RE.sub("", pending[:cut]), pending[cut:]
+        if not sent:
+            text = text.lstrip()
+        if text:
+            sent = True
+            yield text
+    text = _ROLE_RE.sub("", head) if head is not None else _INLINE_ROLE_RE.sub("", pending)
+    if text := text if sent else text.lstrip():
+        yield text
+
+def stream_agent(inputs: dict):
+    graph, config = graph_for(inputs)
+    chunks = queue.Queue()
+
+    async def produce():
+        try:
+            async for message, metadata in graph.astream(inputs, config, stream_mode="messages"):
+                if is_answer_message(message, metadata.get("langgraph_node")):
+                    chunks.put(message.content)
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(None)
+
+    threading.Thread(target=asyncio.run, args=(produce(),), daemon=True).start()
+
+    def pieces():
+        while (piece := chunks.get()) is not None:
+            if isinstance(piece, Exception):
+                raise piece
+            yield piece
+
+    yield from clean_answer_stream(pieces())
+
+# invoke returns the full graph state; stream (MLflow predict_stream) yields answer text as it is generated
+class AgriSarthiAgent(Runnable):
+    def invoke(self, input, config=None, **kwargs):
+        return run_agent(input)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        graph, run_config = graph_for(input)
+        return await graph.ainvoke(input, run_config)
+
+    def stream(self, input, config=None, **kwargs):
+        yield from stream_agent(input)
+
+# Open the connection to the LLM endpoint at load time so the first farmer request
+# does not pay for DNS + TLS setup and endpoint cold start
+def _warmup():
+    for model in (llm, llm_router):
+        try:
+            model.invoke("ok", max_tokens=1)
+        except Exception:
+            log.warning("LLM warmup failed for %s", model.endpoint, exc_info=True)
+
+_warmup()
+
+mlflow.models.set_model(AgriSarthiAgent())
 '''
 
 code_path = "agrisarthi_agent_code.py"
@@ -650,17 +1721,24 @@ with mlflow.start_run(run_name="agrisarthi-v2-agent") as run:
         registered_model_name="agrisarthi.main.agrisarthi_agent",
         pip_requirements=[
             "langchain>=0.3",
-            "langgraph>=0.2",
+            # LatestCheckpointSaver prunes MemorySaver's private storage; checked against
+            # langgraph 1.2 / langgraph-checkpoint 4.2 (tests/test_agent_workflow.py)
+            "langgraph>=0.3,<1.3",
+            "langgraph-checkpoint>=2,<5",
             "langchain-community>=0.3",
             "databricks-vectorsearch",
             "databricks-sdk",
             "mlflow>=2.17",
             "pydantic>=2",
             "requests",
+            "redis>=5",
+            "fastembed",
+            "numpy",
         ],
     )
     mlflow.log_params({
         "llm_endpoint": "databricks-meta-llama-3-3-70b-instruct",
+        "router_endpoint": "databricks-meta-llama-3-1-8b-instruct",
         "num_tools": 6,
         "architecture": "supervisor-specialist-finalanswer",
         "framework": "langgraph",
@@ -676,19 +1754,19 @@ print(f"✅ Registered as: agrisarthi.main.agrisarthi_agent")
 try:
     with mlflow.start_run(run_name="agent-test"):
         # Test 1: Soil query
-        result = agrisarthi_agent.invoke(
+        result = run_agent(
             {"messages": [HumanMessage(content="What crops are best for Lucknow, Uttar Pradesh?")]}
         )
         print("Test 1 Response:", result["messages"][-1].content[:500])
         
         # Test 2: Market price
-        result = agrisarthi_agent.invoke(
+        result = run_agent(
             {"messages": [HumanMessage(content="What is the price of wheat in Lucknow today?")]}
         )
         print("Test 2 Response:", result["messages"][-1].content[:500])
         
         # Test 3: Government scheme
-        result = agrisarthi_agent.invoke(
+        result = run_agent(
             {"messages": [HumanMessage(content="Tell me about PM-KUSUM scheme")]}
         )
         print("Test 3 Response:", result["messages"][-1].content[:500])
@@ -705,11 +1783,13 @@ except Exception as e:
 # MAGIC 
 # MAGIC **Architecture:**
 # MAGIC ```
-# MAGIC Supervisor → routes to specialist
+# MAGIC Supervisor → routes to one specialist, or several in parallel for multi-domain queries
 # MAGIC   ├── SoilCropAdvisor  → [soil_data_retriever, weather_alert, disaster_alert, crop_recommendation]
 # MAGIC   ├── MarketAnalyst    → [market_price_tool]
 # MAGIC   └── FinancialAdvisor → [scheme_search_tool]
 # MAGIC                ↓
+# MAGIC        Aggregator → tools (all specialists' calls run concurrently)
+# MAGIC                ↓
 # MAGIC        FinalAnswerAgent → synthesizes farmer-friendly response
 # MAGIC ```
 # MAGIC 
@@ -159,24 +159,16 @@ print("✅ All evaluation queries completed")
 with mlflow.start_run(run_name="agrisarthi-eval"):
     
     # Custom fact-checking evaluator
-    results = {"total": len(eval_data), "passed": 0, "failed": 0, "by_domain": {}}
+    eval_data["fact_ratio"] = [
+        sum(fact.lower() in response for fact in facts) / len(facts) if facts else 0
+        for response, facts in zip(eval_data["response"].str.lower(), eval_data["expected_facts"])
+    ]
+    eval_data["passed"] = eval_data["fact_ratio"] >= 0.5  # At least 50% of expected facts present
     
-    for _, row in eval_data.iterrows():
-        response_lower = row["response"].lower()
-        facts_found = sum(1 for fact in row["expected_facts"] if fact.lower() in response_lower)
-        fact_ratio = facts_found / len(row["expected_facts"]) if row["expected_facts"] else 0
-        
-        passed = fact_ratio >= 0.5  # At least 50% of expected facts present
-        
-        if passed:
-            results["passed"] += 1
-        else:
-            results["failed"] += 1
-        
-        domain = row["domain"]
-        if domain not in results["by_domain"]:
-            results["by_domain"][domain] = {"passed": 0, "failed": 0}
-        results["by_domain"][domain]["passed" if passed else "failed"] += 1
+    passed_total = int(eval_data["passed"].sum())
+    results = {"total": len(eval_data), "passed": passed_total, "failed": len(eval_data) - passed_total, "by_domain": {}}
+    for domain, passed in eval_data.groupby("domain", sort=False)["passed"]:
+        results["by_domain"][domain] = {"passed": int(passed.sum()), "failed": int((~passed).sum())}
     
     # Log metrics
     mlflow.log_metric("overall_accuracy", results["passed"] / results["total"])
@@ -20,10 +20,6 @@ DATABRICKS_HOST = os.getenv("DATABRICKS_HOST", "")
 DATABRICKS_TOKEN = os.getenv("DATABRICKS_TOKEN", "")
 SQL_WAREHOUSE_ID = os.getenv("DATABRICKS_SQL_WAREHOUSE_ID", "")
 
-if not all([DATAGOV_KEY, DATABRICKS_HOST, DATABRICKS_TOKEN, SQL_WAREHOUSE_ID]):
-    print("ERROR: Set DATAGOV_API_KEY, DATABRICKS_HOST, DATABRICKS_TOKEN, DATABRICKS_SQL_WAREHOUSE_ID in .env")
-    exit(1)
-
 HEADERS = {"Authorization": f"Bearer {DATABRICKS_TOKEN}"}
 
 
@@ -294,6 +290,10 @@ def verify():
 
 
 if __name__ == "__main__":
+    if not all([DATAGOV_KEY, DATABRICKS_HOST, DATABRICKS_TOKEN, SQL_WAREHOUSE_ID]):
+        print("ERROR: Set DATAGOV_API_KEY, DATABRICKS_HOST, DATABRICKS_TOKEN, DATABRICKS_SQL_WAREHOUSE_ID in .env")
+        exit(1)
+
     # Step 1: Fetch from API
     records = fetch_all_prices()
 
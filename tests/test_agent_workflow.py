@@ -0,0 +1,107 @@
+"""Checks for the pure helpers in notebooks/03_agent_workflow.py.
+
+The notebook imports Databricks-only packages at the top, so each test pulls just
+the definitions it needs out of the notebook (and out of the served AGENT_CODE copy)
+and runs them on their own.
+"""
+import ast
+import operator
+import re
+import threading
+from pathlib import Path
+from typing import Annotated, TypedDict
+
+import pytest
+
+NOTEBOOK = Path(__file__).resolve().parents[1] / "notebooks" / "03_agent_workflow.py"
+COPIES = pytest.mark.parametrize("served", [False, True], ids=["notebook", "served"])
+
+ROLE_NAMES = ("_AGENT_NAMES", "_LEAD_ROLE", "_INLINE_ROLE", "_ROLE_RE", "_LEAD_ROLE_RE",
+              "_INLINE_ROLE_RE", "_PREFIX_PROBE", "clean_answer_stream")
+
+
+def _defined_name(node):
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+        return node.name
+    if isinstance(node, ast.Assign):
+        return getattr(node.targets[0], "id", None)
+    if isinstance(node, ast.AnnAssign):
+        return getattr(node.target, "id", None)
+    return None
+
+
+def load_agent(served: bool, *names, **namespace):
+    """Run the top-level definitions called `names` from one copy of the agent."""
+    tree = ast.parse(NOTEBOOK.read_text(encoding="utf-8"))
+    if served:
+        code = next(n.value.value for n in tree.body if _defined_name(n) == "AGENT_CODE")
+        tree = ast.parse(code)
+    nodes = [n for n in tree.body if _defined_name(n) in names]
+    assert {_defined_name(n) for n in nodes} == set(names)
+    namespace.setdefault("re", re)
+    exec(compile(ast.Module(body=nodes, type_ignores=[]), str(NOTEBOOK), "exec"), namespace)
+    return namespace
+
+
+@COPIES
+def test_stream_strips_agent_names_split_across_tokens(served):
+    clean = load_agent(served, *ROLE_NAMES)["clean_answer_stream"]
+    tokens = ["**Market", "Analyst:**", " Onion", " is", " ₹2,400", "/q", "tl", " in", " Delhi", ".",
+              " As", " the", " Market", "Analyst", " noted", ",", " the", " supervisor", " agrees", "."]
+    assert "".join(clean(tokens)) == "Onion is ₹2,400/qtl in Delhi. As the noted, the supervisor agrees."
+    # A name straddling the end of the leading probe
+    assert "".join(clean(["Prices here. Financial", "Advisor", ": apply", " now"])) == "Prices here. apply now"
+
+
+ANSWERS = [
+    "**FinalAnswerAgent:** Wheat MSP is ₹2,425/qtl.\nAsk SoilCropAdvisor: for soil tips.",
+    "Supervisor - Use PM-KISAN.  The supervisor of the mandi said FinancialAdvisor rates fell.",
+    "Onion in Delhi: ₹2,400. MarketAnalyst\nnoted it. MarketAnalystX stays.",
+    "Namaste! Ask me about crops, mandi prices, or farmer schemes.",
+    "MarketAnalyst",
+]
+
+
+@COPIES
+@pytest.mark.parametrize("answer", ANSWERS)
+def test_stream_matches_cleaned_answer(served, answer):
+    """Any chunking of the stream yields what final_answer_agent stores for the full text."""
+    ns = load_agent(served, *ROLE_NAMES)
+    expected = ns["_ROLE_RE"].sub("", answer).lstrip()
+    for i in range(len(answer) + 1):
+        for j in range(i, len(answer) + 1):
+            chunks = [answer[:i], answer[i:j], answer[j:]]
+            assert "".join(ns["clean_answer_stream"](chunks)) == expected, chunks
+
+
+@COPIES
+def test_latest_checkpoint_saver_keeps_only_newest_checkpoint(served):
+    """LatestCheckpointSaver relies on MemorySaver internals; this pins the layout it prunes."""
+    pytest.importorskip("langgraph")
+    from langgraph.checkpoint.memory import MemorySaver
+    from langgraph.graph import END, StateGraph
+
+    saver = load_agent(served, "LatestCheckpointSaver", MemorySaver=MemorySaver,
+                       threading=threading)["LatestCheckpointSaver"]()
+
+    class State(TypedDict):
+        turns: Annotated[list, operator.add]
+        replies: int
+
+    graph = StateGraph(State)
+    graph.add_node("reply", lambda state: {"replies": state.get("replies", 0) + 1})
+    graph.set_entry_point("reply")
+    graph.add_edge("reply", END)
+    app = graph.compile(checkpointer=saver)
+    config = {"configurable": {"thread_id": "farmer-1"}}
+
+    for query in ("onion price", "and in Pune?"):
+        app.invoke({"turns": [query]}, config)
+    latest = saver.get_tuple(config).checkpoint
+    assert list(saver.storage["farmer-1"][""]) == [latest["id"]]
+    assert all(key[2] == latest["id"] for key in saver.writes if key[0] == "farmer-1")
+    assert {key for key in saver.blobs if key[0] == "farmer-1"} <= {
+        ("farmer-1", "", channel, version) for channel, version in latest["channel_versions"].items()}
+
+    state = app.invoke({"turns": ["what about wheat?"]}, config)
+    assert state == {"turns": ["onion price", "and in Pune?", "what about wheat?"], "replies": 3}
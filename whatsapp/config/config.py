@@ -1,12 +1,10 @@
 import os
 import groq
-from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 
 
 def load_environment():
-    """Load and validate environment variables."""
-    load_dotenv()
+    """Validate environment variables (.env is loaded once by whatsapp.main)."""
     required_vars = {"GROQ_API_KEY": os.getenv("GROQ_API_KEY")}
     missing = [k for k, v in required_vars.items() if not v]
     if missing:
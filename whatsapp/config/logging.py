@@ -9,7 +9,8 @@ os.makedirs(logs_dir, exist_ok=True)
 def setup_logger(name="whatsapp"):
     """Configure and return a logger with file + console handlers."""
     _logger = logging.getLogger(name)
-    _logger.setLevel(logging.INFO)
+    # DEBUG adds per-message content (transcripts, translations, agent replies)
+    _logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 
     if not _logger.handlers:
         file_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
@@ -20,11 +21,9 @@ def setup_logger(name="whatsapp"):
             maxBytes=10 * 1024 * 1024,
             backupCount=5,
         )
-        file_handler.setLevel(logging.INFO)
         file_handler.setFormatter(file_formatter)
 
         console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
         console_handler.setFormatter(console_formatter)
 
         _logger.addHandler(file_handler)
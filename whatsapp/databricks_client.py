@@ -22,7 +22,7 @@ def invoke_agent(user_message: str) -> str:
     payload = {"messages": [{"role": "user", "content": user_message}]}
 
     try:
-        logger.info(f"Invoking Databricks agent: {user_message[:80]}...")
+        logger.debug("Invoking Databricks agent: %s...", user_message[:80])
         resp = requests.post(url, headers=headers, json=payload, timeout=120)
         resp.raise_for_status()
         data = resp.json()
@@ -45,15 +45,15 @@ def invoke_agent(user_message: str) -> str:
         if "choices" in data:
             return data["choices"][0]["message"]["content"]
 
-        logger.warning(f"Unexpected response format: {list(data.keys())}")
+        logger.warning("Unexpected response format: %s", list(data.keys()))
         return "I apologize, I'm having trouble processing your request right now. Please try again."
 
     except requests.exceptions.Timeout:
         logger.error("Databricks agent request timed out")
         return "I'm sorry, the request took too long. Please try again in a moment."
     except requests.exceptions.RequestException as e:
-        logger.error(f"Databricks agent request failed: {e}")
+        logger.error("Databricks agent request failed: %s", e)
         return "I'm sorry, I'm facing a technical issue right now. Please try again later."
     except Exception as e:
-        logger.error(f"Unexpected error invoking Databricks agent: {e}", exc_info=True)
+        logger.error("Unexpected error invoking Databricks agent: %s", e, exc_info=True)
         return "I apologize, an unexpected error occurred. Please try again."
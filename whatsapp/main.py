@@ -72,7 +72,7 @@ async def transcribe_base64_audio(base64_audio: str) -> str:
         os.unlink(tmp_file_path)
         return transcription.text
     except Exception as e:
-        logger.error(f"Error during audio transcription: {e}")
+        logger.error("Error during audio transcription: %s", e)
         if "tmp_file_path" in locals() and os.path.exists(tmp_file_path):
             os.unlink(tmp_file_path)
         raise
@@ -91,11 +91,11 @@ async def process_aggregated_messages(sender_id: str, is_voice_message: bool):
         del message_buffers[sender_id]
 
         phone_number = sender_id.split("@")[0]
-        logger.info(f"Processing for {phone_number}: '{combined_message}' (Voice: {is_voice_message})")
+        logger.debug("Processing for %s: '%s' (Voice: %s)", phone_number, combined_message, is_voice_message)
 
         # 1. Detect language
         original_lang = detect_language(combined_message)
-        logger.info(f"Detected language: {original_lang}")
+        logger.debug("Detected language: %s", original_lang)
 
         # 2. Translate to English for agent if needed
         input_for_agent = (
@@ -106,7 +106,7 @@ async def process_aggregated_messages(sender_id: str, is_voice_message: bool):
 
         # 3. Invoke Databricks agent
         final_response = invoke_agent(input_for_agent)
-        logger.info(f"Agent response (English): '{final_response}'")
+        logger.debug("Agent response (English): '%s'", final_response)
 
         # 4. Translate back
         final_response_translated = (
@@ -121,16 +121,16 @@ async def process_aggregated_messages(sender_id: str, is_voice_message: bool):
             if audio_path:
                 send_voice(audio_path, phone_number)
                 os.unlink(audio_path)
-                logger.info(f"Sent TTS voice reply to {phone_number}")
+                logger.info("Sent TTS voice reply to %s", phone_number)
             else:
                 send_message(final_response_translated, phone_number)
-                logger.error(f"TTS failed, sent text fallback to {phone_number}")
+                logger.error("TTS failed, sent text fallback to %s", phone_number)
         else:
             send_message(final_response_translated, phone_number)
-            logger.info(f"Sent text reply to {phone_number}")
+            logger.info("Sent text reply to %s", phone_number)
 
     except Exception as e:
-        logger.error(f"Error in process_aggregated_messages: {str(e)}", exc_info=True)
+        logger.error("Error in process_aggregated_messages: %s", e, exc_info=True)
         send_message(
             "Sorry, an internal error occurred. Please try again.",
             sender_id.split("@")[0],
@@ -144,6 +144,8 @@ async def process_aggregated_messages(sender_id: str, is_voice_message: bool):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("AgriSarthi WhatsApp Bot starting up...")
+    # uvicorn[standard] picks uvloop + httptools automatically where available
+    logger.info("Event loop: %s", type(asyncio.get_running_loop()).__module__)
     yield
     logger.info("AgriSarthi WhatsApp Bot shutting down.")
 
@@ -170,7 +172,7 @@ async def webhook_handler(data: Dict[str, Any]):
 
         if is_voice:
             message_text = await transcribe_base64_audio(parsed_data.body)
-            logger.info(f"Transcribed from {sender_id}: '{message_text}'")
+            logger.debug("Transcribed from %s: '%s'", sender_id, message_text)
         else:
             message_text = parsed_data.body
 
@@ -185,10 +187,10 @@ async def webhook_handler(data: Dict[str, Any]):
         return {"status": "aggregating"}
 
     except ValidationError as e:
-        logger.debug(f"Skipping non-message event: {e.errors()}")
+        logger.debug("Skipping non-message event: %s", e.errors())
         return {"status": "skipped", "reason": "Non-message event"}
     except Exception as e:
-        logger.error(f"Webhook handler error: {str(e)}", exc_info=True)
+        logger.error("Webhook handler error: %s", e, exc_info=True)
         return {"status": "error", "detail": "Internal server error"}
 
 
@@ -34,7 +34,7 @@ def detect_language(text: str) -> str:
         lang_code = detect(text)
         return LANGUAGE_MAP.get(lang_code, "en-IN")
     except Exception as e:
-        logger.error(f"Language detection failed: {e}")
+        logger.error("Language detection failed: %s", e)
         return "en-IN"
 
 
@@ -50,10 +50,10 @@ def detect_language_sarvam(text: str) -> str:
         response = requests.post(f"{SARVAM_API_BASE}/detect-language", headers=headers, json=payload)
         response.raise_for_status()
         detected_lang = response.json().get("language_code", "en-IN")
-        logger.info(f"Detected language: {detected_lang}")
+        logger.debug("Detected language: %s", detected_lang)
         return detected_lang
     except Exception as e:
-        logger.error(f"Sarvam language detection failed: {e}")
+        logger.error("Sarvam language detection failed: %s", e)
         return detect_language(text)
 
 
@@ -85,10 +85,10 @@ def translate_text(text: str, target_language: str, source_language: str = None)
         response = requests.post(f"{SARVAM_API_BASE}/translate", headers=headers, json=payload)
         response.raise_for_status()
         translated_text = response.json().get("translated_text", text)
-        logger.info(f"Translation: {source_language} -> {target_language}")
+        logger.debug("Translation: %s -> %s", source_language, target_language)
         return translated_text
     except Exception as e:
-        logger.error(f"Sarvam translation failed: {e}")
+        logger.error("Sarvam translation failed: %s", e)
         return text
 
 
@@ -125,10 +125,10 @@ def text_to_speech(
         audio_data = base64.b64decode(audio_base64_list[0])
         with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
             tmp_file.write(audio_data)
-            logger.info(f"TTS audio saved: {tmp_file.name}")
+            logger.debug("TTS audio saved: %s", tmp_file.name)
             return tmp_file.name
     except Exception as e:
-        logger.error(f"Sarvam TTS failed: {e}")
+        logger.error("Sarvam TTS failed: %s", e)
         return None
 
 
@@ -151,5 +151,5 @@ def speech_to_text_translate(audio_file_path: str) -> str | None:
             logger.info("Speech-to-text translation successful")
             return transcript
     except Exception as e:
-        logger.error(f"Sarvam STT failed: {e}")
+        logger.error("Sarvam STT failed: %s", e)
         return None
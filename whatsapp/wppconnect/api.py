@@ -41,7 +41,7 @@ def send_message(message: str, phone_number: str) -> Dict:
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
-        logger.error(f"Error sending message: {e}")
+        logger.error("Error sending message: %s", e)
         raise
 
 
@@ -72,5 +72,5 @@ def send_voice(audio_path: str, phone_number: str) -> Dict:
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
-        logger.error(f"Error sending voice message: {e}")
+        logger.error("Error sending voice message: %s", e)
         raise